@@ -0,0 +1,2505 @@
+# aws_auto_healing_extractor.py - Extraction engine behind the Streamlit app and batch_process.py:
+# page extraction and OCR, scenario analysis, caches, S3 upload, deduplication, the search index
+# and the background job queue
+#
+# Kept out of app.py because Streamlit re-executes that script as a fresh __main__ on every rerun;
+# classes defined there stop being picklable for the page worker processes after the first rerun,
+# and cached objects would keep calling into the previous run's module.
+
+import boto3
+import os
+import json
+import tempfile
+from datetime import datetime
+from urllib.parse import quote
+from pathlib import Path, PurePosixPath
+import numpy as np
+from botocore.exceptions import ClientError, NoCredentialsError
+import hashlib
+import gzip
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+try:
+    import tesserocr
+except ImportError:
+    # Optional: without it OCR falls back to one tesseract process per image
+    tesserocr = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional: only needed for the Parquet output
+    pa = pq = None
+import io
+import re
+import math
+import multiprocessing
+import string
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+# One JSON object per line; route this logger to its own handler to ship the events
+metrics_logger = logging.getLogger(f"{__name__}.metrics")
+
+CACHE_DIR = Path(os.environ.get('PDF_PROCESSOR_CACHE_DIR', Path.home() / '.cache' / 'aws-pdf-processor'))
+
+class ProcessingCancelled(Exception):
+    pass
+
+class ProcessingReporter:
+    # Where the extractor and S3 manager send progress and messages; the default only logs,
+    # so both classes can run headless
+    def progress(self, page_number: int, total_pages: int, priority_score: int) -> None:
+        logger.debug("Processed page %d/%d (priority score %d)", page_number, total_pages, priority_score)
+
+    def info(self, message: str) -> None:
+        logger.info(message)
+
+    def success(self, message: str) -> None:
+        logger.info(message)
+
+    def warning(self, message: str) -> None:
+        logger.warning(message)
+
+    def error(self, message: str) -> None:
+        logger.error(message)
+
+class DiskCache:
+    suffix = '.bin'
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._bytes_since_eviction = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._entry_path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        return data
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Write to a private file first; several processes may store the same key concurrently
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        
+        self._bytes_since_eviction += len(data)
+        if self._bytes_since_eviction >= self.max_bytes // 20:
+            self.evict()
+
+    def evict(self) -> None:
+        self._bytes_since_eviction = 0
+        entries = []
+        total_bytes = 0
+        
+        for path in self.cache_dir.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+        
+        if total_bytes <= self.max_bytes:
+            return
+        
+        # Least recently used entries go first
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_bytes -= size
+
+class OCRCache(DiskCache):
+    suffix = '.txt'
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(cache_dir or CACHE_DIR / 'ocr', max_bytes)
+
+    def make_key(self, image_samples, settings: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(settings.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(image_samples)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        data = self._read(key)
+        return data.decode('utf-8') if data is not None else None
+
+    def put(self, key: str, text: str) -> None:
+        self._write(key, text.encode('utf-8'))
+
+class ResultCache(DiskCache):
+    suffix = '.json.gz'
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = 1024 * 1024 * 1024):
+        super().__init__(cache_dir or CACHE_DIR / 'results', max_bytes)
+
+    def make_key(self, pdf_path: str, settings: str) -> str:
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as pdf_file:
+            for block in iter(lambda: pdf_file.read(1024 * 1024), b''):
+                digest.update(block)
+        return hashlib.sha256(f"{digest.hexdigest()}|{settings}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            extraction_data = json.loads(gzip.decompress(data))
+        except (OSError, ValueError):
+            return None
+        
+        # Scenarios are stored as records pointing into consolidated_text; rebuild them around
+        # one shared buffer, with high priority entries referring to the same objects
+        document_text = DocumentText(extraction_data['consolidated_text'])
+        scenarios = [Scenario.from_record(record, document_text)
+                     for record in extraction_data['auto_healing_scenarios']]
+        scenarios_by_page = {scenario.page_number: scenario for scenario in scenarios}
+        extraction_data['auto_healing_scenarios'] = scenarios
+        extraction_data['high_priority_content'] = [scenarios_by_page[record['page_number']]
+                                                    for record in extraction_data['high_priority_content']]
+        return extraction_data
+
+    def put(self, key: str, extraction_data: Dict[str, Any]) -> None:
+        payload = json.dumps(extraction_data, ensure_ascii=False, separators=(',', ':'), default=_scenario_record)
+        self._write(key, gzip.compress(payload.encode('utf-8')))
+
+OCR_STAT_COUNTERS = (
+    'images_seen', 'ocr_runs', 'ocr_failed', 'xref_hits', 'cache_hits', 'cache_misses',
+    'skipped_tiny', 'skipped_disabled', 'skipped_small_area', 'skipped_text_layer', 'skipped_low_variance'
+)
+
+# Stages timed for every page, followed by the document-level stages
+PAGE_STAGES = ('text_extraction', 'image_decode', 'ocr', 'analysis')
+PIPELINE_STAGES = PAGE_STAGES + ('training_generation', 'deduplication', 's3_upload')
+
+def log_event(event: str, **fields) -> None:
+    if metrics_logger.isEnabledFor(logging.INFO):
+        metrics_logger.info(json.dumps({'event': event, 'time': datetime.now().isoformat(), **fields},
+                                       ensure_ascii=False, default=str))
+
+class PipelineMetrics:
+    # Process-wide counters and stage timings in the Prometheus text exposition format. The
+    # extractor only records timings and counters in the extraction metadata; whoever owns the
+    # process (the Streamlit job queue, the batch CLI) feeds finished documents in here and
+    # writes the metrics file, which node_exporter's textfile collector or any scraper can read.
+    PREFIX = 'pdf_processor'
+
+    def __init__(self, textfile_path: Optional[str] = None):
+        self.textfile_path = Path(textfile_path) if textfile_path else None
+        self._counters = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe_stage(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            total, runs = self._stages.get(stage, (0.0, 0))
+            self._stages[stage] = (total + seconds, runs + count)
+
+    def record_document(self, extraction_data: Optional[Dict[str, Any]], status: str) -> None:
+        self.inc('documents_total', status=status)
+        # Deduplication runs after extraction, so it also applies to results served from the cache
+        deduplication = extraction_data['metadata'].get('deduplication') if extraction_data else None
+        if deduplication:
+            self.inc('training_examples_total', deduplication['examples_in'])
+            self.inc('training_examples_duplicate_total', deduplication['duplicates_within_document'],
+                     scope='document')
+            self.inc('training_examples_duplicate_total', deduplication['duplicates_across_documents'],
+                     scope='corpus')
+        if not extraction_data or extraction_data['metadata'].get('result_cache_hit'):
+            return
+        
+        metadata = extraction_data['metadata']
+        self.inc('pages_total', metadata['total_pages'])
+        self.inc('pages_reused_total', metadata.get('pages_reused', 0))
+        for counter, value in metadata.get('ocr_cache', {}).items():
+            if counter.startswith('skipped_'):
+                self.inc('ocr_skipped_total', value, reason=counter[len('skipped_'):])
+            elif counter in OCR_STAT_COUNTERS:
+                self.inc(f'{counter}_total', value)
+        for stage, seconds in metadata.get('stage_timings', {}).items():
+            if stage != 's3_upload':
+                self.observe_stage(stage, seconds)
+
+    def record_upload(self, extraction_data: Dict[str, Any]) -> None:
+        metadata = extraction_data['metadata']
+        self.inc('bytes_uploaded_total', metadata.get('bytes_uploaded', 0))
+        self.observe_stage('s3_upload', metadata['stage_timings'].get('s3_upload', 0.0))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            stages = sorted(self._stages.items())
+        
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{self.PREFIX}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        
+        if stages:
+            metric = f"{self.PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for stage, (total, runs) in stages:
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {runs}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self) -> None:
+        if self.textfile_path is None:
+            return
+        # Written beside the target and renamed so a scrape never sees a partial file
+        self.textfile_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.textfile_path.with_name(f".{self.textfile_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp_path, self.textfile_path)
+
+# PDF_PROCESSOR_METRICS_FILE: Prometheus text file rewritten after every document.
+# PDF_PROCESSOR_METRICS_LOG: file that receives the page, document and upload events as JSON
+# lines ('-' for stderr). Without it the events only appear if the host configures logging.
+METRICS = PipelineMetrics(os.environ.get('PDF_PROCESSOR_METRICS_FILE'))
+
+def configure_metrics_log(target: Optional[str]) -> None:
+    # Streamlit re-executes this module on every rerun, so only the first call attaches a handler
+    if not target or metrics_logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr) if target == '-' else logging.FileHandler(target, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    metrics_logger.addHandler(handler)
+    metrics_logger.setLevel(logging.INFO)
+    # The lines are already JSON; keep them out of the regular log format
+    metrics_logger.propagate = False
+
+configure_metrics_log(os.environ.get('PDF_PROCESSOR_METRICS_LOG'))
+
+class OCRPolicy:
+    # Decides per image whether Tesseract is worth running.
+    #   never  - no OCR at all
+    #   always - OCR every image of at least MIN_IMAGE_SIZE pixels per side (the original behaviour)
+    #   auto   - additionally skip images that are small on the page, whose area is already
+    #            covered by the text layer, or whose pixels are too uniform to hold text
+    MODES = ('never', 'auto', 'always')
+    MIN_IMAGE_SIZE = 50
+
+    def __init__(self, mode: str = 'auto', min_area_fraction: float = 0.03, max_text_coverage: float = 0.3,
+                 min_entropy: float = 1.0, min_contrast: float = 12.0, sample_grid: int = 64):
+        if mode not in self.MODES:
+            raise ValueError(f"OCR mode must be one of {', '.join(self.MODES)}, got {mode!r}")
+        self.mode = mode
+        self.min_area_fraction = min_area_fraction
+        self.max_text_coverage = max_text_coverage
+        self.min_entropy = min_entropy
+        self.min_contrast = min_contrast
+        self.sample_grid = sample_grid
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'never'
+
+    def settings(self) -> str:
+        if self.mode != 'auto':
+            return self.mode
+        return (f"auto:{self.min_area_fraction}:{self.max_text_coverage}:{self.min_entropy}:"
+                f"{self.min_contrast}:{self.sample_grid}")
+
+    def skip_reason(self, page_context: Dict[str, Any], xref: int, width: int, height: int) -> Optional[str]:
+        # Decided from the image's size and placement, before its pixels are decoded; see also
+        # is_low_variance
+        if width < self.MIN_IMAGE_SIZE or height < self.MIN_IMAGE_SIZE:
+            return 'tiny'
+        if self.mode == 'always':
+            return None
+        
+        page = page_context['page']
+        page_area = abs(page.rect)
+        image_rects = [rect for rect in page.get_image_rects(xref) if not rect.is_empty]
+        
+        # Images that are not placed visibly on the page fall through to the pixel check
+        if image_rects and page_area:
+            image_area = sum(abs(rect) for rect in image_rects)
+            if image_area / page_area < self.min_area_fraction:
+                return 'small_area'
+            if self._text_coverage(page_context, image_rects, image_area) >= self.max_text_coverage:
+                return 'text_layer'
+        return None
+
+    def _text_coverage(self, page_context: Dict[str, Any], image_rects, image_area: float) -> float:
+        # Share of the image area already covered by words in the page's text layer
+        if 'word_rects' not in page_context:
+            page_context['word_rects'] = [fitz.Rect(word[:4]) for word in page_context['page'].get_text("words")]
+        
+        covered_area = 0.0
+        for image_rect in image_rects:
+            for word_rect in page_context['word_rects']:
+                overlap = word_rect & image_rect
+                if not overlap.is_empty:
+                    covered_area += abs(overlap)
+        return covered_area / image_area
+
+    def is_low_variance(self, pix: "fitz.Pixmap") -> bool:
+        # Samples a coarse grid of pixels; flat fills, gradients and blank scans have a
+        # near-empty luminance histogram or almost no contrast
+        if self.mode != 'auto':
+            return False
+        samples = pix.samples_mv
+        colour_channels = max(1, min(3, pix.n - pix.alpha))
+        step_x = max(1, pix.width // self.sample_grid)
+        step_y = max(1, pix.height // self.sample_grid)
+        
+        histogram = [0] * 256
+        for y in range(0, pix.height, step_y):
+            row_offset = y * pix.stride
+            for x in range(0, pix.width, step_x):
+                offset = row_offset + x * pix.n
+                histogram[sum(samples[offset:offset + colour_channels]) // colour_channels] += 1
+        
+        total = sum(histogram)
+        mean = sum(value * count for value, count in enumerate(histogram)) / total
+        variance = sum(count * (value - mean) ** 2 for value, count in enumerate(histogram)) / total
+        entropy = -sum((count / total) * math.log2(count / total) for count in histogram if count)
+        return entropy < self.min_entropy or math.sqrt(variance) < self.min_contrast
+
+# Characters that re.IGNORECASE treats as equal to an ASCII letter. Folding them one-to-one keeps
+# match offsets in the folded text aligned with the original text.
+_CASE_FOLD_TABLE = {ord(c): c.lower() for c in string.ascii_uppercase}
+_CASE_FOLD_TABLE.update({0x130: 'i', 0x131: 'i', 0x17F: 's', 0x212A: 'k'})
+
+def fold_case(text: str) -> str:
+    return text.lower() if text.isascii() else text.translate(_CASE_FOLD_TABLE)
+
+def _fold_pattern(pattern: str) -> str:
+    # Lower-case literals only; escapes such as \S or \W keep their meaning
+    if pattern.startswith('(?i)'):
+        pattern = pattern[4:]
+    folded = []
+    escaped = False
+    for char in pattern:
+        folded.append(char if escaped else char.lower())
+        escaped = not escaped and char == '\\'
+    return ''.join(folded)
+
+_WORD_RE = re.compile(r'[a-z]+')
+
+class ProcedureParser:
+    # Line-oriented extraction of procedure steps and shell commands. Each line is inspected a
+    # bounded number of times with no backtracking, so the cost stays linear in the page length
+    # however garbled the OCR text is; the regexes this replaces could take seconds on pages full
+    # of digit runs and short lines. Works on the original text and its case-folded copy, which
+    # fold_case keeps character-aligned.
+    ORDINAL_WORDS = frozenset(('first', 'then', 'next', 'finally', 'lastly'))
+    COMMAND_PREFIXES = frozenset(('aws', 'sudo', 'docker', 'kubectl', 'terraform'))
+    STEP_DELIMITERS = '.:-) \t'
+    MAX_STEP_DIGITS = 3
+    MAX_STEP_LINES = 20
+    MAX_ACTION_CHARS = 500
+    MAX_COMMAND_CHARS = 1000
+
+    def parse(self, text: str, folded_text: str):
+        # Returns (steps, commands): steps are (number or ordinal word, action) tuples, numbered
+        # steps first and then ordinal ones, each in page order; commands are unique, in page order
+        numbered_steps = []
+        ordinal_steps = []
+        commands = {}
+        current_step = None
+        
+        for line, folded_line in zip(text.split('\n'), folded_text.split('\n')):
+            if not folded_line.strip():
+                # A blank line ends the current step
+                current_step = self._close_step(current_step, numbered_steps)
+                continue
+            
+            step = self._numbered_step(line, folded_line)
+            if step is not None:
+                self._close_step(current_step, numbered_steps)
+                current_step = step
+            elif current_step is not None and len(current_step[1]) < self.MAX_STEP_LINES:
+                current_step[1].append(line.strip())
+            
+            self._ordinal_steps(line, folded_line, ordinal_steps)
+            
+            command = self._command(line, folded_line)
+            if command and len(command) <= self.MAX_COMMAND_CHARS:
+                commands.setdefault(command, None)
+        
+        self._close_step(current_step, numbered_steps)
+        return numbered_steps + ordinal_steps, list(commands)
+
+    def _close_step(self, step, steps: List[Any]) -> None:
+        if step is not None:
+            steps.append((step[0], "\n".join(step[1])[:self.MAX_ACTION_CHARS]))
+        return None
+
+    def _numbered_step(self, line: str, folded_line: str):
+        # "3. Restart the instance", "Step 3: ...", "12) ..." at the start of a line
+        stripped = folded_line.lstrip()
+        offset = len(folded_line) - len(stripped)
+        end = len(stripped)
+        pos = 0
+        if stripped.startswith('step'):
+            pos = 4
+            while pos < end and stripped[pos] in ' \t':
+                pos += 1
+        
+        digits_start = pos
+        while pos < end and stripped[pos] in '0123456789' and pos - digits_start < self.MAX_STEP_DIGITS:
+            pos += 1
+        if pos == digits_start or (pos < end and stripped[pos] in '0123456789'):
+            return None
+        digits_end = pos
+        
+        while pos < end and stripped[pos] in self.STEP_DELIMITERS:
+            pos += 1
+        if pos == digits_end or pos == end or stripped[pos] in '0123456789':
+            # No delimiter ("3rd"), nothing after it, or a version/address such as "10.0.0.1"
+            return None
+        
+        action = line[offset + pos:].strip()
+        if not any(char.isalpha() for char in action[:self.MAX_ACTION_CHARS]):
+            return None
+        return [line[offset + digits_start:offset + digits_end], [action]]
+
+    def _ordinal_steps(self, line: str, folded_line: str, steps: List[Any]) -> None:
+        # "First, open the console" / "then restart the task": the action runs to the next full stop
+        if not any(word in folded_line for word in self.ORDINAL_WORDS):
+            return
+        
+        end = len(folded_line)
+        period = -1
+        for match in _WORD_RE.finditer(folded_line):
+            if match.group() not in self.ORDINAL_WORDS:
+                continue
+            pos = match.end()
+            while pos < end and folded_line[pos] in ', \t\r\f\v':
+                pos += 1
+            if pos == match.end():
+                continue
+            
+            # The full stop search only ever moves forward, so the line is scanned once
+            if period < pos:
+                period = folded_line.find('.', pos)
+                if period == -1:
+                    period = end
+            action = line[pos:min(period, pos + self.MAX_ACTION_CHARS)].strip()
+            if action:
+                steps.append((line[match.start():match.end()], action))
+
+    def _command(self, line: str, folded_line: str) -> Optional[str]:
+        stripped = line.strip()
+        if stripped.startswith('$'):
+            return stripped[1:].strip() or None
+        
+        first_word, _, rest = folded_line.strip().partition(' ')
+        if first_word in self.COMMAND_PREFIXES and rest.strip():
+            return stripped
+        
+        # An AWS CLI call quoted inside prose, e.g. "run aws ec2 describe-instances to check"
+        index = folded_line.find('aws ')
+        while index != -1:
+            if index == 0 or not folded_line[index - 1].isalnum():
+                pos = index + 4
+                end = len(folded_line)
+                while pos < end and folded_line[pos] in ' \t':
+                    pos += 1
+                service_start = pos
+                while pos < end and (folded_line[pos].isalnum() or folded_line[pos] == '_') and pos - service_start < 40:
+                    pos += 1
+                if pos > service_start and pos < end and folded_line[pos] in ' \t' and folded_line[pos:].strip():
+                    return line[index:].strip()
+            index = folded_line.find('aws ', index + 1)
+        return None
+
+# Precompiled matchers for page analysis. Case-insensitive patterns run case-sensitively over a
+# case-folded copy of the page, which the regex engine scans several times faster than
+# IGNORECASE alternations; each page is folded once and shared by every matcher.
+class PatternClassifier:
+
+    def __init__(self, category_patterns: Dict[str, str], services_pattern: str,
+                 procedure_parser: Optional[ProcedureParser] = None):
+        self.category_patterns = {name: self._compile(pattern, re.IGNORECASE)
+                                  for name, pattern in category_patterns.items()}
+        self.services_pattern = self._compile(services_pattern, re.IGNORECASE)
+        self.procedure_parser = procedure_parser or ProcedureParser()
+
+    @staticmethod
+    def _compile(pattern: str, flags: int):
+        if pattern.startswith('(?i)') or flags & re.IGNORECASE:
+            return re.compile(_fold_pattern(pattern), flags & ~re.IGNORECASE), True
+        return re.compile(pattern, flags), False
+
+    @staticmethod
+    def _findall(matcher, text: str, folded_text: str) -> List[Any]:
+        pattern, on_folded = matcher
+        if not on_folded:
+            return pattern.findall(text)
+        
+        # Same shape as re.findall, but sliced from the original text to keep its casing
+        matches = []
+        for match in pattern.finditer(folded_text):
+            if pattern.groups == 0:
+                matches.append(text[match.start():match.end()])
+                continue
+            groups = tuple(text[match.start(group):match.end(group)] if match.start(group) != -1 else ''
+                           for group in range(1, pattern.groups + 1))
+            matches.append(groups[0] if pattern.groups == 1 else groups)
+        return matches
+
+    def category_counts(self, folded_text: str) -> Dict[str, int]:
+        counts = {}
+        for name, (pattern, _) in self.category_patterns.items():
+            count = len(pattern.findall(folded_text))
+            if count:
+                counts[name] = count
+        return counts
+
+    def services(self, text: str, folded_text: str) -> List[str]:
+        return list(set(self._findall(self.services_pattern, text, folded_text)))
+
+    def procedures(self, text: str, folded_text: str):
+        # Steps and commands come from one parser pass: (steps, commands)
+        return self.procedure_parser.parse(text, folded_text)
+
+class PageTextJoiner:
+    # Collects page texts as they arrive and joins them into consolidated_text, recording the
+    # character offset at which each page starts in the joined text
+    SEPARATOR = "\n\n"
+
+    def __init__(self):
+        self._pages = []
+        self.text_offsets = []
+        self.text_length = 0
+
+    def append(self, text: str) -> int:
+        # Returns the page's offset
+        if self._pages:
+            self.text_length += len(self.SEPARATOR)
+        offset = self.text_length
+        self.text_offsets.append(offset)
+        self._pages.append(text)
+        self.text_length += len(text)
+        return offset
+
+    def join(self) -> str:
+        return self.SEPARATOR.join(self._pages)
+
+class DocumentText:
+    # The consolidated text of one document, shared by every scenario that points into it
+    __slots__ = ('text',)
+
+    def __init__(self, text: str = ""):
+        self.text = text
+
+class Scenario:
+    # One auto-healing scenario. The page text is not copied into it: once bound, the scenario
+    # is a span of the document's consolidated text, so each one costs only its analysis results
+    # however long the page is. Until then (e.g. inside a page worker) it holds its page text.
+    __slots__ = ('page_number', 'aws_services', 'auto_healing_analysis', 'actionable_content',
+                 'text_offset', 'text_length', '_document_text', '_page_text')
+
+    def __init__(self, page_number: int, page_text: str, aws_services: List[str],
+                 auto_healing_analysis: Dict[str, Any], actionable_content: Dict[str, Any]):
+        self.page_number = page_number
+        self.aws_services = aws_services
+        self.auto_healing_analysis = auto_healing_analysis
+        self.actionable_content = actionable_content
+        self.text_offset = 0
+        self.text_length = len(page_text)
+        self._document_text = None
+        self._page_text = page_text
+
+    @property
+    def priority_score(self) -> int:
+        return self.auto_healing_analysis['priority_score']
+
+    @property
+    def text_content(self) -> str:
+        # Sliced on demand; only valid once the document's consolidated text has been filled in
+        if self._document_text is None:
+            return self._page_text
+        return self._document_text.text[self.text_offset:self.text_offset + self.text_length]
+
+    def bind(self, document_text: DocumentText, text_offset: int) -> None:
+        self._document_text = document_text
+        self.text_offset = text_offset
+        self._page_text = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        # The published shape, as written to high_priority_scenarios.json
+        return {
+            'page_number': self.page_number,
+            'text_content': self.text_content,
+            'aws_services': self.aws_services,
+            'auto_healing_analysis': self.auto_healing_analysis,
+            'actionable_content': self.actionable_content
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        # Everything but the text, which is stored once for the whole document
+        return {
+            'page_number': self.page_number,
+            'text_offset': self.text_offset,
+            'text_length': self.text_length,
+            'aws_services': self.aws_services,
+            'auto_healing_analysis': self.auto_healing_analysis,
+            'actionable_content': self.actionable_content
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], text) -> "Scenario":
+        # text is the shared DocumentText the record's offsets point into, or the page text itself
+        page_text = text if isinstance(text, str) else ""
+        scenario = cls(record['page_number'], page_text, record['aws_services'],
+                       record['auto_healing_analysis'], record['actionable_content'])
+        if isinstance(text, DocumentText):
+            scenario.bind(text, record['text_offset'])
+            scenario.text_length = record['text_length']
+        return scenario
+
+def _scenario_dict(obj):
+    # json default hook: scenarios are expanded one at a time as the encoder reaches them
+    if isinstance(obj, Scenario):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _scenario_record(obj):
+    if isinstance(obj, Scenario):
+        return obj.to_record()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OCRBackend:
+    name = 'base'
+
+    def image_to_string(self, image: Image.Image, lang: str, config: str) -> str:
+        raise NotImplementedError
+
+    def image_to_string_batch(self, images: List[Image.Image], lang: str, config: str) -> List[Any]:
+        # Returns the text for each image, or the exception it raised
+        results = []
+        for image in images:
+            try:
+                results.append(self.image_to_string(image, lang, config))
+            except Exception as e:
+                results.append(e)
+        return results
+
+class PytesseractBackend(OCRBackend):
+    # Spawns the tesseract CLI for every image
+    name = 'pytesseract'
+
+    def image_to_string(self, image: Image.Image, lang: str, config: str) -> str:
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+
+class TesserocrBackend(OCRBackend):
+    # A pool of in-process Tesseract engines that keep their traineddata loaded between images.
+    # tesserocr releases the GIL while recognising, so a page's images run in parallel threads.
+    name = 'tesserocr'
+
+    def __init__(self, pool_size: int = 1):
+        self.pool_size = pool_size
+        self._engines = {}
+        self._lock = threading.Lock()
+        self._threads = None
+
+    def _engine_pool(self, lang: str) -> "queue.Queue":
+        with self._lock:
+            if lang not in self._engines:
+                engines = queue.Queue()
+                for _ in range(self.pool_size):
+                    engines.put(tesserocr.PyTessBaseAPI(lang=lang))
+                self._engines[lang] = engines
+            return self._engines[lang]
+
+    def image_to_string(self, image: Image.Image, lang: str, config: str) -> str:
+        if config:
+            raise ValueError("tesserocr does not accept tesseract command-line options")
+        engines = self._engine_pool(lang)
+        engine = engines.get()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            engines.put(engine)
+
+    def image_to_string_batch(self, images: List[Image.Image], lang: str, config: str) -> List[Any]:
+        if self.pool_size == 1 or len(images) < 2:
+            return super().image_to_string_batch(images, lang, config)
+        
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='ocr')
+        
+        futures = [self._threads.submit(self.image_to_string, image, lang, config) for image in images]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+OCR_BACKENDS = ('auto', 'tesserocr', 'pytesseract')
+
+# Backends live for the whole process, so worker processes reuse loaded engines across pages
+# and documents
+_ocr_backends = {}
+_ocr_backends_lock = threading.Lock()
+
+def resolve_ocr_backend_name(name: str, ocr_config: str = '') -> str:
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"OCR backend must be one of {', '.join(OCR_BACKENDS)}, got {name!r}")
+    if name == 'auto':
+        # Command-line options such as --psm only apply to the tesseract CLI
+        return 'tesserocr' if tesserocr is not None and not ocr_config else 'pytesseract'
+    if name == 'tesserocr' and tesserocr is None:
+        raise ValueError("The tesserocr OCR backend requires the tesserocr package")
+    return name
+
+def get_ocr_backend(name: str, pool_size: int = 1) -> OCRBackend:
+    with _ocr_backends_lock:
+        backend = _ocr_backends.get((name, pool_size))
+        if backend is None:
+            backend = TesserocrBackend(pool_size) if name == 'tesserocr' else PytesseractBackend()
+            _ocr_backends[(name, pool_size)] = backend
+        return backend
+
+# Page workers are started from a fork server (spawned where there is none) instead of being
+# forked from the caller: the Streamlit server and the job queue run many threads, and a forked
+# child would inherit whatever locks they held, including those of the OCR engine pools
+PAGE_WORKER_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+def pixmap_to_image(pix: "fitz.Pixmap") -> Image.Image:
+    # Wraps the pixmap's sample buffer directly instead of encoding to PNG and decoding it again.
+    # Expects a greyscale or RGB pixmap without alpha (see prepare_ocr_pixmap); the pixmap must
+    # outlive the image.
+    mode = 'L' if pix.n == 1 else 'RGB'
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+
+def document_key(relative_path: str) -> str:
+    # Identifies a runbook across runs: its path below the input root without the .pdf suffix, so
+    # same-named PDFs in different folders keep separate manifests. Files at the root, and
+    # uploads, which have no folder, are keyed by their file stem.
+    path = PurePosixPath(relative_path.replace('\\', '/'))
+    return (path.with_suffix('') if path.suffix.lower() == '.pdf' else path).as_posix()
+
+class AWSAutoHealingExtractor:
+    # Bump whenever the patterns or scenario format change so cached results are not reused
+    PATTERN_VERSION = '3'
+
+    # Page ranges handed to each worker process; more ranges than workers smooths out uneven pages
+    CHUNKS_PER_WORKER = 4
+    # Longest side, in pixels, an image is downscaled to before OCR
+    MAX_OCR_DIMENSION = 3000
+
+    def __init__(self, max_workers: Optional[int] = None, ocr_cache: Optional[OCRCache] = None,
+                 result_cache: Optional[ResultCache] = None, ocr_mode: str = 'auto', ocr_backend: str = 'auto',
+                 ocr_threads: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Tesseract engines (and threads) per page worker. Callers that already run several
+        # extractors in parallel divide the CPUs themselves and pass the share in; on its own an
+        # extractor spreads the CPUs over its page workers.
+        self.ocr_threads = ocr_threads or max(1, (os.cpu_count() or 1) // self.max_workers)
+        self.ocr_cache = ocr_cache if ocr_cache is not None else OCRCache()
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.ocr_lang = 'eng'
+        self.ocr_config = ''
+        self.ocr_policy = OCRPolicy(ocr_mode)
+        self.ocr_backend_name = resolve_ocr_backend_name(ocr_backend, self.ocr_config)
+        
+        self.aws_services_pattern = r'\b(EC2|S3|RDS|Lambda|CloudFormation|ECS|EKS|IAM|VPC|CloudWatch|SNS|SQS|DynamoDB|Route53|ELB|ALB|NLB|API Gateway|Cognito|CloudFront|ElastiCache|Redshift|EMR|Glue|Step Functions|SageMaker|Bedrock|CodeBuild|CodeDeploy|CodePipeline|Systems Manager|SSM|Parameter Store|Secrets Manager|KMS|ACM|WAF|Shield|GuardDuty|Security Hub|Config|CloudTrail|X-Ray|EventBridge|Kinesis|MSK|OpenSearch|DocumentDB|Aurora|Neptune|QLDB|Timestream|AppSync|Amplify|Auto Scaling|Elastic Beanstalk|Batch|Fargate)\b'
+        
+        self.auto_healing_patterns = {
+            'error_scenarios': r'(?i)(error|failed|failure|exception|timeout|connection\s*refused|access\s*denied|not\s*found|unavailable|down|outage)',
+            'solution_patterns': r'(?i)(solution|fix|resolve|remediation|workaround|recovery|restore|restart|retry|rollback)',
+            'monitoring_alerts': r'(?i)(alert|alarm|threshold|metric|monitoring|dashboard|notification|trigger)',
+            'troubleshooting': r'(?i)(troubleshoot|diagnose|investigate|debug|check|verify|validate|test)',
+            'automation': r'(?i)(automate|script|lambda|function|trigger|schedule|cron|event\s*driven)',
+            'health_checks': r'(?i)(health\s*check|status|ping|probe|heartbeat|availability|uptime)',
+            'scaling_actions': r'(?i)(scale\s*up|scale\s*down|auto\s*scaling|capacity|instance|load|cpu|memory)',
+            'recovery_procedures': r'(?i)(backup|snapshot|restore|failover|disaster\s*recovery|DR|redundancy)'
+        }
+        
+        self.classifier = PatternClassifier(self.auto_healing_patterns, self.aws_services_pattern)
+
+    @property
+    def ocr_backend(self) -> OCRBackend:
+        # Resolved per process: the extractor itself is pickled into page workers, engines are not
+        return get_ocr_backend(self.ocr_backend_name, self.ocr_threads)
+
+    def _image_to_string(self, image: Image.Image) -> str:
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+        text = self.ocr_backend.image_to_string(image, self.ocr_lang, self.ocr_config)
+        return text.strip()
+
+    def extract_text_from_image(self, image_data: bytes) -> str:
+        try:
+            return self._image_to_string(Image.open(io.BytesIO(image_data)))
+        except Exception as e:
+            logger.error("OCR failed: %s", e)
+            return ""
+
+    def prepare_ocr_pixmap(self, pix: "fitz.Pixmap") -> "fitz.Pixmap":
+        # Colourspace conversion and downscaling happen inside MuPDF on the raw samples
+        source = pix
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        
+        oversized = max(pix.width, pix.height) > self.MAX_OCR_DIMENSION
+        if oversized and pix.n != 1:
+            # Large scans are read in greyscale; Tesseract binarises them anyway
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        elif pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        
+        if oversized:
+            if pix is source:
+                pix = fitz.Pixmap(pix)
+            pix.shrink(math.ceil(math.log2(max(pix.width, pix.height) / self.MAX_OCR_DIMENSION)))
+        
+        return pix
+
+    def _lookup_ocr_text(self, pix: "fitz.Pixmap", xref: int, ocr_memo: Dict[int, Optional[str]],
+                         ocr_stats: Dict[str, int]):
+        # Returns (text, cache_key); text is None when the image still has to be OCR'd
+        cache_key = None
+        if self.ocr_cache is not None:
+            settings = (f"{self.ocr_backend_name}|{self.ocr_lang}|{self.ocr_config}|"
+                        f"{pix.width}x{pix.height}x{pix.n}|{self.MAX_OCR_DIMENSION}")
+            cache_key = self.ocr_cache.make_key(pix.samples_mv, settings)
+            cached_text = self.ocr_cache.get(cache_key)
+            if cached_text is not None:
+                ocr_stats['cache_hits'] += 1
+                ocr_memo[xref] = cached_text
+                return cached_text, cache_key
+            ocr_stats['cache_misses'] += 1
+        
+        return None, cache_key
+
+    def _store_ocr_text(self, xref: int, cache_key: Optional[str], text: str, ocr_memo: Dict[int, Optional[str]],
+                        ocr_stats: Dict[str, int]) -> str:
+        text = text.strip()
+        ocr_stats['ocr_runs'] += 1
+        ocr_memo[xref] = text
+        if cache_key is not None:
+            self.ocr_cache.put(cache_key, text)
+        return text
+
+    def identify_auto_healing_content(self, text: str, folded_text: Optional[str] = None) -> Dict[str, Any]:
+        content_analysis = {
+            'content_types': [],
+            'error_scenarios': [],
+            'solutions': [],
+            'automation_opportunities': [],
+            'priority_score': 0
+        }
+        
+        if folded_text is None:
+            folded_text = fold_case(text)
+        
+        for pattern_type, match_count in self.classifier.category_counts(folded_text).items():
+            content_analysis['content_types'].append(pattern_type)
+            content_analysis['priority_score'] += match_count
+        
+        return content_analysis
+
+    def extract_aws_services(self, text: str, folded_text: Optional[str] = None) -> List[str]:
+        if folded_text is None:
+            folded_text = fold_case(text)
+        return self.classifier.services(text, folded_text)
+
+    def extract_actionable_content(self, text: str, folded_text: Optional[str] = None) -> Dict[str, Any]:
+        actionable_content = {
+            'procedures': [],
+            'commands': [],
+            'conditions': [],
+            'thresholds': [],
+            'configurations': []
+        }
+        
+        if folded_text is None:
+            folded_text = fold_case(text)
+        
+        steps, commands = self.classifier.procedures(text, folded_text)
+        
+        # Extract step-by-step procedures
+        for step, action in steps:
+            actionable_content['procedures'].append({
+                'step': step,
+                'action': action
+            })
+        
+        # Extract AWS CLI commands
+        actionable_content['commands'].extend(commands)
+        
+        return actionable_content
+
+    def process_page(self, doc: "fitz.Document", page_num: int,
+                     ocr_memo: Optional[Dict[int, Optional[str]]] = None) -> Dict[str, Any]:
+        # ocr_memo maps image xrefs to their OCR text, or to None for images rejected as too
+        # uniform to hold text; it is shared by the pages one worker processes
+        timings = dict.fromkeys(PAGE_STAGES, 0.0)
+        started = time.perf_counter()
+        page = doc.load_page(page_num)
+        page_text = page.get_text()
+        timings['text_extraction'] = time.perf_counter() - started
+        warnings = []
+        ocr_stats = dict.fromkeys(OCR_STAT_COUNTERS, 0)
+        if ocr_memo is None:
+            ocr_memo = {}
+        
+        # Process images with OCR
+        started = time.perf_counter()
+        image_list = page.get_images(full=True)
+        ocr_stats['images_seen'] = len(image_list)
+        page_ocr_texts = {}
+        pending_ocr = {}
+        
+        if not self.ocr_policy.enabled:
+            ocr_stats['skipped_disabled'] = len(image_list)
+            image_list = []
+        
+        policy_context = {'page': page}
+        
+        for img_index, img in enumerate(image_list):
+            try:
+                xref, width, height = img[0], img[2], img[3]
+                skip_reason = self.ocr_policy.skip_reason(policy_context, xref, width, height)
+                if skip_reason:
+                    ocr_stats[f'skipped_{skip_reason}'] += 1
+                    continue
+                
+                if xref in pending_ocr:
+                    # Placed twice on this page; the pending OCR result serves both
+                    ocr_stats['xref_hits'] += 1
+                    pending_ocr[xref]['img_indexes'].append(img_index)
+                    continue
+                
+                if xref in ocr_memo:
+                    # The same xref is often placed on many pages of one document
+                    if ocr_memo[xref] is None:
+                        ocr_stats['skipped_low_variance'] += 1
+                    else:
+                        ocr_stats['xref_hits'] += 1
+                        page_ocr_texts[img_index] = ocr_memo[xref]
+                    continue
+                
+                pix = fitz.Pixmap(doc, xref)
+                if self.ocr_policy.is_low_variance(pix):
+                    ocr_memo[xref] = None
+                    ocr_stats['skipped_low_variance'] += 1
+                    pix = None
+                    continue
+                
+                ocr_text, cache_key = self._lookup_ocr_text(pix, xref, ocr_memo, ocr_stats)
+                if ocr_text is not None:
+                    page_ocr_texts[img_index] = ocr_text
+                else:
+                    pending_ocr[xref] = {
+                        'img_indexes': [img_index],
+                        'cache_key': cache_key,
+                        'pixmap': self.prepare_ocr_pixmap(pix)
+                    }
+                
+                pix = None
+                
+            except Exception as e:
+                ocr_stats['ocr_failed'] += 1
+                warnings.append(f"Error processing image {img_index + 1} on page {page_num + 1}: {e}")
+        
+        timings['image_decode'] = time.perf_counter() - started
+        
+        # Images that still need OCR go to the backend as one batch
+        started = time.perf_counter()
+        if pending_ocr:
+            images = [pixmap_to_image(pending['pixmap']) for pending in pending_ocr.values()]
+            results = self.ocr_backend.image_to_string_batch(images, self.ocr_lang, self.ocr_config)
+            images = None
+            
+            for (xref, pending), result in zip(pending_ocr.items(), results):
+                if isinstance(result, Exception):
+                    ocr_stats['ocr_failed'] += 1
+                    for img_index in pending['img_indexes']:
+                        warnings.append(f"Error processing image {img_index + 1} on page {page_num + 1}: {result}")
+                    continue
+                
+                ocr_text = self._store_ocr_text(xref, pending['cache_key'], result, ocr_memo, ocr_stats)
+                for img_index in pending['img_indexes']:
+                    page_ocr_texts[img_index] = ocr_text
+            
+            pending_ocr = None
+        
+        timings['ocr'] = time.perf_counter() - started
+        
+        ocr_text_from_page = "".join(f"\n[OCR from Image {img_index + 1}]: {ocr_text}\n"
+                                     for img_index, ocr_text in sorted(page_ocr_texts.items()) if ocr_text)
+        
+        combined_page_text = page_text + ocr_text_from_page
+        
+        # Analyze content for auto healing relevance
+        started = time.perf_counter()
+        folded_page_text = fold_case(combined_page_text)
+        auto_healing_analysis = self.identify_auto_healing_content(combined_page_text, folded_page_text)
+        
+        page_scenario = None
+        if auto_healing_analysis['priority_score'] > 0:
+            page_scenario = Scenario(
+                page_num + 1,
+                combined_page_text,
+                self.extract_aws_services(combined_page_text, folded_page_text),
+                auto_healing_analysis,
+                self.extract_actionable_content(combined_page_text, folded_page_text)
+            )
+        
+        timings['analysis'] = time.perf_counter() - started
+        
+        return {
+            'page_number': page_num + 1,
+            'text': combined_page_text,
+            'priority_score': auto_healing_analysis['priority_score'],
+            'scenario': page_scenario,
+            'warnings': warnings,
+            'ocr_stats': ocr_stats,
+            'timings': timings
+        }
+
+    def iter_pages(self, pdf_path: str):
+        # Yields one result per page, in page order, as soon as that page is available
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        doc.close()
+        
+        yield from self._iter_page_results(pdf_path, range(page_count))
+
+    def _iter_page_results(self, pdf_path: str, page_numbers):
+        # Processes the given 0-based page numbers and yields their results in the order given
+        page_numbers = list(page_numbers)
+        workers = min(self.max_workers, len(page_numbers))
+        
+        if workers <= 1:
+            doc = fitz.open(pdf_path)
+            ocr_memo = {}
+            try:
+                for page_num in page_numbers:
+                    yield self.process_page(doc, page_num, ocr_memo)
+            finally:
+                doc.close()
+            return
+        
+        # Split the pages into contiguous batches; several batches per worker keeps the pool
+        # balanced when some pages are much heavier than others
+        chunk_size = max(1, math.ceil(len(page_numbers) / (workers * self.CHUNKS_PER_WORKER)))
+        page_batches = [page_numbers[start:start + chunk_size]
+                        for start in range(0, len(page_numbers), chunk_size)]
+        
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=PAGE_WORKER_CONTEXT)
+        try:
+            futures = deque(executor.submit(_process_pages, self, pdf_path, batch)
+                            for batch in page_batches)
+            
+            # Merge back in page order regardless of which batch finishes first; batches are
+            # released as soon as they have been yielded
+            while futures:
+                yield from futures.popleft().result()
+        finally:
+            # Stops outstanding batches if the caller abandons the generator early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def result_cache_settings(self) -> str:
+        return (f"{self.PATTERN_VERSION}|{self.ocr_backend_name}|{self.ocr_lang}|{self.ocr_config}|"
+                f"{self.ocr_policy.settings()}")
+
+    def fingerprint_pages(self, pdf_path: str) -> List[str]:
+        # A page fingerprint covers its text layer, the raw bytes and placement of every image on
+        # it, and the extraction settings, so an unchanged fingerprint means the page would
+        # produce the same scenario again. Raw image streams are hashed without decoding them.
+        settings = self.result_cache_settings()
+        doc = fitz.open(pdf_path)
+        try:
+            image_digests = {}
+            fingerprints = []
+            for page in doc:
+                digest = hashlib.sha256(settings.encode('utf-8'))
+                digest.update(page.get_text().encode('utf-8'))
+                for img in page.get_images(full=True):
+                    xref = img[0]
+                    if xref not in image_digests:
+                        image_digests[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b"").hexdigest()
+                    digest.update(image_digests[xref].encode('ascii'))
+                    for rect in page.get_image_rects(xref):
+                        digest.update(f"{rect.x0:.1f},{rect.y0:.1f},{rect.x1:.1f},{rect.y1:.1f}".encode('ascii'))
+                fingerprints.append(digest.hexdigest())
+            return fingerprints
+        finally:
+            doc.close()
+
+    def _new_extraction_data(self, pdf_path: str) -> Dict[str, Any]:
+        pdf_name = Path(pdf_path).stem
+        doc = fitz.open(pdf_path)
+        
+        extraction_data = {
+            'metadata': {
+                'source_file': pdf_name,
+                'document_key': document_key(Path(pdf_path).name),
+                'extraction_date': datetime.now().isoformat(),
+                'total_pages': len(doc),
+                'document_title': doc.metadata.get('title', pdf_name),
+                'extraction_type': 'auto_healing_focused',
+                'stage_timings': dict.fromkeys(PIPELINE_STAGES, 0.0)
+            },
+            'consolidated_text': "",
+            'auto_healing_scenarios': [],
+            'aws_services_found': set(),
+            'training_examples': [],
+            'high_priority_content': []
+        }
+        
+        doc.close()
+        return extraction_data
+
+    def _collect_page_result(self, extraction_data: Dict[str, Any], page_result: Dict[str, Any],
+                             ocr_stats: Dict[str, int], reporter: ProcessingReporter,
+                             document_text: DocumentText, text_offset: int) -> None:
+        for warning in page_result['warnings']:
+            reporter.warning(warning)
+        
+        for counter, value in page_result['ocr_stats'].items():
+            ocr_stats[counter] += value
+        
+        stage_timings = extraction_data['metadata']['stage_timings']
+        for stage, seconds in page_result['timings'].items():
+            stage_timings[stage] += seconds
+        
+        if page_result['timings']:
+            log_event('page', source_file=extraction_data['metadata']['source_file'],
+                      page_number=page_result['page_number'], priority_score=page_result['priority_score'],
+                      timings={stage: round(seconds, 6) for stage, seconds in page_result['timings'].items()},
+                      ocr_stats={counter: value for counter, value in page_result['ocr_stats'].items() if value})
+        
+        page_scenario = page_result['scenario']
+        if page_scenario:
+            # From here on the scenario reads its text from the shared buffer, so the page's own
+            # copy can be released
+            page_scenario.bind(document_text, text_offset)
+            extraction_data['auto_healing_scenarios'].append(page_scenario)
+            extraction_data['aws_services_found'].update(page_scenario.aws_services)
+            
+            if page_result['priority_score'] > 3:
+                extraction_data['high_priority_content'].append(page_scenario)
+        
+        # Update progress
+        reporter.progress(page_result['page_number'], extraction_data['metadata']['total_pages'],
+                          page_result['priority_score'])
+
+    def _finish_extraction_data(self, extraction_data: Dict[str, Any], ocr_stats: Dict[str, int],
+                                started: float) -> None:
+        metadata = extraction_data['metadata']
+        extraction_data['aws_services_found'] = list(extraction_data['aws_services_found'])
+        ocr_stats['ocr_avoided_by_policy'] = sum(ocr_stats[counter] for counter in
+                                                 ('skipped_disabled', 'skipped_small_area',
+                                                  'skipped_text_layer', 'skipped_low_variance'))
+        metadata['ocr_cache'] = ocr_stats
+        
+        # Generate training examples
+        training_started = time.perf_counter()
+        self.generate_auto_healing_training_data(extraction_data)
+        metadata['stage_timings']['training_generation'] = time.perf_counter() - training_started
+        metadata['processing_seconds'] = time.perf_counter() - started
+        
+        log_event('document', source_file=metadata['source_file'], total_pages=metadata['total_pages'],
+                  processing_seconds=round(metadata['processing_seconds'], 6),
+                  stage_timings={stage: round(seconds, 6) for stage, seconds in metadata['stage_timings'].items()},
+                  ocr_stats=ocr_stats, training_examples=len(extraction_data['training_examples']))
+
+    def process_pdf_for_auto_healing(self, pdf_path: str, reporter: Optional[ProcessingReporter] = None) -> Dict[str, Any]:
+        reporter = reporter or ProcessingReporter()
+        try:
+            pdf_name = Path(pdf_path).stem
+            
+            # Identical uploads return the stored result without touching the PDF again
+            result_key = None
+            if self.result_cache is not None:
+                result_key = self.result_cache.make_key(pdf_path, self.result_cache_settings())
+                cached_data = self.result_cache.get(result_key)
+                if cached_data is not None:
+                    cached_data['metadata']['source_file'] = pdf_name
+                    cached_data['metadata']['document_key'] = document_key(Path(pdf_path).name)
+                    cached_data['metadata']['result_cache_hit'] = True
+                    return cached_data
+            
+            started = time.perf_counter()
+            extraction_data = self._new_extraction_data(pdf_path)
+            ocr_stats = dict.fromkeys(OCR_STAT_COUNTERS, 0)
+            
+            # Scenarios point into the consolidated text, which only exists once every page is in
+            document_text = DocumentText()
+            page_texts = PageTextJoiner()
+            for page_result in self.iter_pages(pdf_path):
+                text_offset = page_texts.append(page_result['text'])
+                self._collect_page_result(extraction_data, page_result, ocr_stats, reporter,
+                                          document_text, text_offset)
+            
+            extraction_data['consolidated_text'] = document_text.text = page_texts.join()
+            extraction_data['page_offsets'] = page_texts.text_offsets
+            
+            self._finish_extraction_data(extraction_data, ocr_stats, started)
+            
+            if result_key is not None:
+                self.result_cache.put(result_key, extraction_data)
+            extraction_data['metadata']['result_cache_hit'] = False
+            
+            return extraction_data
+            
+        except ProcessingCancelled:
+            raise
+        except Exception as e:
+            reporter.error(f"Error processing PDF: {e}")
+            return None
+
+    def process_pdf_incremental(self, pdf_path: str, previous_pages: Dict[str, Dict[str, Any]],
+                                reporter: Optional[ProcessingReporter] = None,
+                                fingerprints: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Like process_pdf_for_auto_healing, but pages whose fingerprint appears in previous_pages
+        # (fingerprint -> stored page record, see S3Manager.load_previous_pages) are taken from
+        # the previous version instead of being extracted again. The result carries one
+        # page record per page in 'page_records'.
+        reporter = reporter or ProcessingReporter()
+        try:
+            started = time.perf_counter()
+            if fingerprints is None:
+                fingerprints = self.fingerprint_pages(pdf_path)
+            changed_pages = [page_num for page_num, fingerprint in enumerate(fingerprints)
+                             if fingerprint not in previous_pages]
+            
+            extraction_data = self._new_extraction_data(pdf_path)
+            ocr_stats = dict.fromkeys(OCR_STAT_COUNTERS, 0)
+            page_records = []
+            
+            # Only changed pages go through the page engine; its results arrive in page order
+            # and are merged with the reused pages as the document is walked
+            fresh_results = self._iter_page_results(pdf_path, changed_pages)
+            document_text = DocumentText()
+            page_texts = PageTextJoiner()
+            try:
+                for page_num, fingerprint in enumerate(fingerprints):
+                    previous_record = previous_pages.get(fingerprint)
+                    if previous_record is not None:
+                        page_result = self._page_result_from_record(previous_record, page_num + 1)
+                    else:
+                        page_result = next(fresh_results)
+                    
+                    text_offset = page_texts.append(page_result['text'])
+                    self._collect_page_result(extraction_data, page_result, ocr_stats, reporter,
+                                              document_text, text_offset)
+                    page_records.append({
+                        'page_number': page_num + 1,
+                        'fingerprint': fingerprint,
+                        'text_offset': text_offset,
+                        'text_length': len(page_result['text']),
+                        'priority_score': page_result['priority_score'],
+                        'scenario': page_result['scenario'],
+                        'reused': previous_record is not None
+                    })
+                
+                extraction_data['consolidated_text'] = document_text.text = page_texts.join()
+                extraction_data['page_offsets'] = page_texts.text_offsets
+            finally:
+                # Shuts the page engine down if extraction stops early
+                fresh_results.close()
+            
+            self._finish_extraction_data(extraction_data, ocr_stats, started)
+            
+            extraction_data['page_records'] = page_records
+            assign_page_training_examples(extraction_data)
+            extraction_data['metadata']['pages_reused'] = len(fingerprints) - len(changed_pages)
+            extraction_data['metadata']['pages_reprocessed'] = len(changed_pages)
+            extraction_data['metadata']['result_cache_hit'] = False
+            
+            return extraction_data
+            
+        except ProcessingCancelled:
+            raise
+        except Exception as e:
+            reporter.error(f"Error processing PDF: {e}")
+            return None
+
+    def _page_result_from_record(self, page_record: Dict[str, Any], page_number: int) -> Dict[str, Any]:
+        # A reused page may have moved, so its scenario takes the page number in this version
+        scenario = None
+        if page_record['scenario']:
+            scenario = Scenario.from_record(page_record['scenario'], page_record['text'])
+            scenario.page_number = page_number
+        return {
+            'page_number': page_number,
+            'text': page_record['text'],
+            'priority_score': page_record['priority_score'],
+            'scenario': scenario,
+            'warnings': [],
+            'ocr_stats': {},
+            'timings': {}
+        }
+
+    def generate_auto_healing_training_data(self, extraction_data: Dict[str, Any]) -> None:
+        extraction_data['training_examples'] = self.build_training_examples(extraction_data['auto_healing_scenarios'])
+
+    def build_training_examples(self, scenarios: List[Scenario]) -> List[Dict[str, Any]]:
+        training_examples = []
+        
+        # Problem-Solution pairs
+        for scenario in scenarios:
+            if scenario.auto_healing_analysis['error_scenarios'] and scenario.actionable_content['procedures']:
+                
+                error_context = " ".join(scenario.auto_healing_analysis['error_scenarios'][:3])
+                solution_steps = "\n".join([f"{proc['step']}. {proc['action']}" 
+                                          for proc in scenario.actionable_content['procedures'][:5]])
+                
+                training_example = {
+                    "instruction": "Provide an auto healing solution for this AWS issue",
+                    "input": f"Problem: {error_context}\nAWS Services: {', '.join(scenario.aws_services)}",
+                    "output": solution_steps,
+                    "metadata": {
+                        "source_page": scenario.page_number,
+                        "priority_score": scenario.priority_score,
+                        "aws_services": scenario.aws_services,
+                        "content_types": scenario.auto_healing_analysis['content_types']
+                    }
+                }
+                training_examples.append(training_example)
+        
+        # Command-based examples
+        for scenario in scenarios:
+            if scenario.actionable_content['commands']:
+                command_text = "\n".join(scenario.actionable_content['commands'][:5])
+                
+                training_example = {
+                    "instruction": "What AWS CLI commands would help resolve this issue?",
+                    "input": f"AWS Services: {', '.join(scenario.aws_services)}\nContext: Auto healing scenario",
+                    "output": command_text,
+                    "metadata": {
+                        "source_page": scenario.page_number,
+                        "command_count": len(scenario.actionable_content['commands'])
+                    }
+                }
+                training_examples.append(training_example)
+        
+        return training_examples
+
+def assign_page_training_examples(extraction_data: Dict[str, Any]) -> None:
+    # Incremental uploads store each page's training examples in its page object
+    examples_by_page = {}
+    for example in extraction_data['training_examples']:
+        examples_by_page.setdefault(example['metadata']['source_page'], []).append(example)
+    for page_record in extraction_data['page_records']:
+        page_record['training_examples'] = examples_by_page.get(page_record['page_number'], [])
+
+def _process_pages(extractor: AWSAutoHealingExtractor, pdf_path: str, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    # Runs inside a worker process, so it opens its own document handle
+    doc = fitz.open(pdf_path)
+    ocr_memo = {}
+    try:
+        return [extractor.process_page(doc, page_num, ocr_memo) for page_num in page_numbers]
+    finally:
+        doc.close()
+
+class S3StreamingUpload:
+    # S3 multipart parts must be at least 5 MiB (except the last one)
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket_name: str, key: str, content_type: str, part_size: int = PART_SIZE):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = None
+
+    def write(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+
+    def _upload_part(self, data: bytes) -> None:
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+            self._upload_id = response['UploadId']
+        
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def close(self) -> None:
+        # Objects smaller than one part never start a multipart upload
+        if self._upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+            self._buffer.clear()
+            return
+        
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={'Parts': self._parts}
+        )
+
+    def abort(self) -> None:
+        if self._upload_id is not None:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self._upload_id
+            )
+            self._upload_id = None
+
+def _iter_encoded(pieces, chunk_chars: int = 64 * 1024):
+    # Groups many small string pieces into fewer UTF-8 chunks
+    batch = []
+    batch_chars = 0
+    for piece in pieces:
+        batch.append(piece)
+        batch_chars += len(piece)
+        if batch_chars >= chunk_chars:
+            yield "".join(batch).encode('utf-8')
+            batch = []
+            batch_chars = 0
+    if batch:
+        yield "".join(batch).encode('utf-8')
+
+def _iter_jsonl(items: List[Dict[str, Any]]):
+    for index, item in enumerate(items):
+        if index:
+            yield "\n"
+        yield json.dumps(item, ensure_ascii=False)
+
+def _iter_text_slices(text: str, chunk_chars: int = 1024 * 1024):
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+# Columnar export. Each table is written as zstd-compressed Parquet under a Hive-style partition
+# per document, so engines such as Athena, Spark or pyarrow.dataset can prune by source_file and
+# push down filters on the typed columns without reading the text columns:
+#
+#   training_data_parquet/{table}/source_file={document_key}/part-0.parquet
+#
+# Each partition holds a single part that every upload of the document overwrites, so the tables
+# describe the latest version of each runbook and never count an older version's rows again.
+# The partition value is the document key (see document_key()), so same-named PDFs in different
+# folders get separate partitions; it is URL-escaped, as Hive partitioning expects.
+# scenario_services has one row per (scenario, service) so "service = 'EC2'" is a plain column
+# filter rather than a list search. Rows are sorted so row-group statistics stay selective.
+PARQUET_TABLES = ('training_examples', 'scenarios', 'scenario_services')
+
+def _parquet_schemas():
+    string_list = pa.list_(pa.string())
+    extraction_date = pa.field('extraction_date', pa.timestamp('s'))
+    return {
+        'training_examples': pa.schema([
+            pa.field('source_page', pa.int32()),
+            pa.field('example_type', pa.string()),
+            pa.field('priority_score', pa.int32()),
+            pa.field('command_count', pa.int32()),
+            pa.field('aws_services', string_list),
+            pa.field('content_types', string_list),
+            pa.field('instruction', pa.string()),
+            pa.field('input', pa.string()),
+            pa.field('output', pa.string()),
+            extraction_date
+        ]),
+        'scenarios': pa.schema([
+            pa.field('page_number', pa.int32()),
+            pa.field('priority_score', pa.int32()),
+            pa.field('aws_services', string_list),
+            pa.field('content_types', string_list),
+            pa.field('error_scenarios', string_list),
+            pa.field('procedure_count', pa.int32()),
+            pa.field('command_count', pa.int32()),
+            pa.field('commands', string_list),
+            pa.field('text_length', pa.int32()),
+            pa.field('text_content', pa.string()),
+            extraction_date
+        ]),
+        'scenario_services': pa.schema([
+            pa.field('service', pa.string()),
+            pa.field('page_number', pa.int32()),
+            pa.field('priority_score', pa.int32()),
+            extraction_date
+        ])
+    }
+
+def _parquet_rows(table_name: str, extraction_data: Dict[str, Any], extraction_date: datetime):
+    if table_name == 'training_examples':
+        for example in extraction_data['training_examples']:
+            metadata = example['metadata']
+            yield {
+                'source_page': metadata['source_page'],
+                'example_type': 'problem_solution' if 'priority_score' in metadata else 'command',
+                'priority_score': metadata.get('priority_score'),
+                'command_count': metadata.get('command_count'),
+                'aws_services': metadata.get('aws_services', []),
+                'content_types': metadata.get('content_types', []),
+                'instruction': example['instruction'],
+                'input': example['input'],
+                'output': example['output'],
+                'extraction_date': extraction_date
+            }
+    elif table_name == 'scenarios':
+        for scenario in sorted(extraction_data['auto_healing_scenarios'],
+                               key=lambda scenario: -scenario.priority_score):
+            yield {
+                'page_number': scenario.page_number,
+                'priority_score': scenario.priority_score,
+                'aws_services': scenario.aws_services,
+                'content_types': scenario.auto_healing_analysis['content_types'],
+                'error_scenarios': scenario.auto_healing_analysis['error_scenarios'],
+                'procedure_count': len(scenario.actionable_content['procedures']),
+                'command_count': len(scenario.actionable_content['commands']),
+                'commands': scenario.actionable_content['commands'],
+                'text_length': scenario.text_length,
+                'text_content': scenario.text_content,
+                'extraction_date': extraction_date
+            }
+    else:
+        service_rows = [(service, scenario.page_number, scenario.priority_score)
+                        for scenario in extraction_data['auto_healing_scenarios']
+                        for service in scenario.aws_services]
+        for service, page_number, priority_score in sorted(service_rows, key=lambda row: (row[0], -row[2], row[1])):
+            yield {
+                'service': service,
+                'page_number': page_number,
+                'priority_score': priority_score,
+                'extraction_date': extraction_date
+            }
+
+def build_parquet_table(table_name: str, extraction_data: Dict[str, Any]) -> "pa.Table":
+    schema = _parquet_schemas()[table_name]
+    extraction_date = datetime.fromisoformat(extraction_data['metadata']['extraction_date']).replace(microsecond=0)
+    rows = list(_parquet_rows(table_name, extraction_data, extraction_date))
+    return pa.Table.from_pylist(rows, schema=schema)
+
+def parquet_bytes(table: "pa.Table") -> bytes:
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression='zstd', row_group_size=10000)
+    return buffer.getvalue()
+
+class S3Manager:
+    def __init__(self, s3_client=None, max_concurrency: int = 4, reporter: Optional[ProcessingReporter] = None):
+        self.bucket_name = None
+        self.max_concurrency = max_concurrency
+        self.reporter = reporter or ProcessingReporter()
+        self._transfer_pool = None
+        
+        if s3_client is not None:
+            self.s3_client = s3_client
+            return
+        
+        try:
+            self.s3_client = boto3.client('s3')
+        except NoCredentialsError:
+            self.reporter.error("AWS credentials not found. Please configure your AWS credentials.")
+            self.s3_client = None
+
+    @property
+    def transfer_pool(self) -> ThreadPoolExecutor:
+        # One pool per manager, shared by every upload it performs
+        if self._transfer_pool is None:
+            self._transfer_pool = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                     thread_name_prefix='s3-transfer')
+        return self._transfer_pool
+
+    def stream_object(self, bucket_name: str, key: str, chunks, content_type: str) -> int:
+        upload = S3StreamingUpload(self.s3_client, bucket_name, key, content_type)
+        try:
+            for chunk in chunks:
+                upload.write(chunk)
+            upload.close()
+        except Exception:
+            upload.abort()
+            raise
+        return upload.bytes_written
+
+    def list_buckets(self):
+        if not self.s3_client:
+            return []
+        try:
+            response = self.s3_client.list_buckets()
+            return [bucket['Name'] for bucket in response['Buckets']]
+        except ClientError as e:
+            self.reporter.error(f"Error listing buckets: {e}")
+            return []
+
+    def create_bucket(self, bucket_name, region='us-east-1'):
+        if not self.s3_client:
+            return False
+        try:
+            if region == 'us-east-1':
+                self.s3_client.create_bucket(Bucket=bucket_name)
+            else:
+                self.s3_client.create_bucket(
+                    Bucket=bucket_name,
+                    CreateBucketConfiguration={'LocationConstraint': region}
+                )
+            return True
+        except ClientError as e:
+            self.reporter.error(f"Error creating bucket: {e}")
+            return False
+
+    def _submit_parquet_uploads(self, bucket_name: str, extraction_data: Dict[str, Any], uploads: List[Any]) -> None:
+        if pa is None:
+            self.reporter.warning("Parquet output needs pyarrow (pip install pyarrow); skipped")
+            return
+        
+        partition = quote(extraction_data['metadata']['document_key'], safe='')
+        for table_name in PARQUET_TABLES:
+            key = f"training_data_parquet/{table_name}/source_file={partition}/part-0.parquet"
+            # Tables are built inside the transfer pool so encoding overlaps the other uploads
+            uploads.append(self.transfer_pool.submit(
+                self._put_parquet, bucket_name, key, table_name, extraction_data
+            ))
+
+    def _put_parquet(self, bucket_name: str, key: str, table_name: str, extraction_data: Dict[str, Any]) -> int:
+        body = parquet_bytes(build_parquet_table(table_name, extraction_data))
+        return self._put_bytes(bucket_name, key, body, 'application/vnd.apache.parquet')
+
+    def upload_training_data_to_s3(self, bucket_name: str, extraction_data: Dict[str, Any], pdf_name: str,
+                                   columnar: bool = False) -> bool:
+        if not self.s3_client:
+            return False
+        
+        try:
+            started = time.perf_counter()
+            
+            # Create a unique folder name based on PDF name and timestamp
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            folder_name = f"training_data/{pdf_name}_{timestamp}"
+            
+            uploads = []
+            
+            # Columnar copies of the training examples and scenarios
+            if columnar:
+                self._submit_parquet_uploads(bucket_name, extraction_data, uploads)
+            
+            # Upload training data as JSONL
+            uploads.append(self.transfer_pool.submit(
+                self.stream_object, bucket_name, f"{folder_name}/auto_healing_training.jsonl",
+                _iter_encoded(_iter_jsonl(extraction_data['training_examples'])), 'application/jsonl'
+            ))
+            
+            # Upload consolidated text
+            uploads.append(self.transfer_pool.submit(
+                self.stream_object, bucket_name, f"{folder_name}/consolidated_text.txt",
+                _iter_encoded(_iter_text_slices(extraction_data['consolidated_text'])), 'text/plain'
+            ))
+            
+            # Upload high priority scenarios
+            if extraction_data['high_priority_content']:
+                # The pure-Python encoder used for indented output is lazy, so each scenario is
+                # expanded to a dict (and its text sliced) only when the upload reaches it
+                priority_json = json.JSONEncoder(indent=2, ensure_ascii=False, default=_scenario_dict).iterencode(
+                    extraction_data['high_priority_content'])
+                uploads.append(self.transfer_pool.submit(
+                    self.stream_object, bucket_name, f"{folder_name}/high_priority_scenarios.json",
+                    _iter_encoded(priority_json), 'application/json'
+                ))
+            
+            # Upload summary
+            summary = {
+                "extraction_summary": {
+                    "total_pages": extraction_data['metadata']['total_pages'],
+                    "auto_healing_scenarios": len(extraction_data['auto_healing_scenarios']),
+                    "high_priority_scenarios": len(extraction_data['high_priority_content']),
+                    "training_examples": len(extraction_data['training_examples']),
+                    "aws_services_found": extraction_data['aws_services_found'],
+                    "total_text_length": len(extraction_data['consolidated_text'])
+                }
+            }
+            if 'deduplication' in extraction_data['metadata']:
+                summary['extraction_summary']['deduplication'] = extraction_data['metadata']['deduplication']
+            
+            summary_json = json.dumps(summary, indent=2, ensure_ascii=False)
+            uploads.append(self.transfer_pool.submit(
+                self._put_bytes, bucket_name, f"{folder_name}/extraction_summary.json",
+                summary_json.encode('utf-8'), 'application/json'
+            ))
+            
+            bytes_uploaded = self._wait_for_uploads(uploads)
+            self._record_upload(extraction_data, bucket_name, folder_name, len(uploads), bytes_uploaded, started)
+            
+            self.reporter.success(f"✅ Training data uploaded to S3: s3://{bucket_name}/{folder_name}/")
+            return True
+            
+        except ClientError as e:
+            self.reporter.error(f"Error uploading to S3: {e}")
+            return False
+
+    def _put_bytes(self, bucket_name: str, key: str, body: bytes, content_type: str) -> int:
+        self.s3_client.put_object(Bucket=bucket_name, Key=key, Body=body, ContentType=content_type)
+        return len(body)
+
+    def _wait_for_uploads(self, uploads) -> int:
+        # Wait for every object so a failure in any of them is reported; returns the bytes sent
+        errors = []
+        bytes_uploaded = 0
+        for upload in uploads:
+            try:
+                bytes_uploaded += upload.result()
+            except ClientError as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return bytes_uploaded
+
+    def _record_upload(self, extraction_data: Dict[str, Any], bucket_name: str, prefix: str, objects: int,
+                       bytes_uploaded: int, started: float) -> None:
+        metadata = extraction_data['metadata']
+        seconds = time.perf_counter() - started
+        metadata.setdefault('stage_timings', {})['s3_upload'] = seconds
+        metadata['bytes_uploaded'] = bytes_uploaded
+        log_event('upload', source_file=metadata['source_file'], destination=f"s3://{bucket_name}/{prefix}/",
+                  objects=objects, bytes_uploaded=bytes_uploaded, seconds=round(seconds, 6))
+
+    # Incremental layout: one manifest per document, listing a JSON object per page. Page objects
+    # are named by page number and fingerprint, so a new version of the document only uploads the
+    # pages whose content or position changed. Documents are identified by document_key().
+    #
+    #   training_data/{document_key}/manifest.json
+    #   training_data/{document_key}/pages/{page_number:05d}_{fingerprint[:16]}.json
+
+    def load_manifest(self, bucket_name: str, document_key: str) -> Optional[Dict[str, Any]]:
+        if not self.s3_client:
+            return None
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=f"training_data/{document_key}/manifest.json")
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                self.reporter.warning(f"Could not read the previous manifest, reprocessing every page: {e}")
+            return None
+
+    def _load_page_record(self, bucket_name: str, key: str) -> Dict[str, Any]:
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=key)
+        return json.loads(response['Body'].read())
+
+    def load_previous_pages(self, bucket_name: str, document_key: str, fingerprints: List[str]):
+        # Returns the previous manifest and the stored records of the pages that are unchanged in
+        # the new version, keyed by fingerprint. Records that cannot be read are left out, so
+        # those pages are simply extracted again.
+        manifest = self.load_manifest(bucket_name, document_key)
+        if manifest is None:
+            return None, {}
+        
+        wanted = set(fingerprints)
+        keys = {}
+        for page in manifest['pages']:
+            if page['fingerprint'] in wanted:
+                keys.setdefault(page['fingerprint'], page['key'])
+        
+        downloads = {fingerprint: self.transfer_pool.submit(self._load_page_record, bucket_name, key)
+                     for fingerprint, key in keys.items()}
+        previous_pages = {}
+        for fingerprint, download in downloads.items():
+            try:
+                previous_pages[fingerprint] = download.result()
+            except (ClientError, ValueError) as e:
+                logger.warning("Could not read page record %s: %s", keys[fingerprint], e)
+        return manifest, previous_pages
+
+    def upload_incremental_training_data(self, bucket_name: str, extraction_data: Dict[str, Any],
+                                         previous_manifest: Optional[Dict[str, Any]] = None,
+                                         columnar: bool = False) -> bool:
+        if not self.s3_client:
+            return False
+        
+        try:
+            started = time.perf_counter()
+            document_key = extraction_data['metadata']['document_key']
+            folder_name = f"training_data/{document_key}"
+            # Deduplication against other documents can change the examples of an unchanged page
+            previous_example_counts = {page['key']: page['training_examples']
+                                       for page in previous_manifest['pages']} if previous_manifest else {}
+            previous_keys = set(previous_example_counts)
+            
+            manifest_pages = []
+            uploads = []
+            for page_record in extraction_data['page_records']:
+                key = f"{folder_name}/pages/{page_record['page_number']:05d}_{page_record['fingerprint'][:16]}.json"
+                manifest_pages.append({
+                    'page_number': page_record['page_number'],
+                    'fingerprint': page_record['fingerprint'],
+                    'key': key,
+                    'training_examples': len(page_record['training_examples'])
+                })
+                if previous_example_counts.get(key) == len(page_record['training_examples']):
+                    continue
+                
+                # Page objects are self-contained: the page text plus the scenario without offsets
+                text_offset = page_record['text_offset']
+                scenario = page_record['scenario']
+                body = json.dumps({
+                    'page_number': page_record['page_number'],
+                    'fingerprint': page_record['fingerprint'],
+                    'priority_score': page_record['priority_score'],
+                    'text': extraction_data['consolidated_text'][text_offset:text_offset + page_record['text_length']],
+                    'scenario': {field: value for field, value in scenario.to_record().items()
+                                 if field not in ('text_offset', 'text_length')} if scenario else None,
+                    'training_examples': page_record['training_examples']
+                }, ensure_ascii=False)
+                uploads.append(self.transfer_pool.submit(
+                    self._put_bytes, bucket_name, key, body.encode('utf-8'), 'application/json'
+                ))
+            page_uploads = len(uploads)
+            
+            # The columnar tables always describe the whole current version
+            if columnar:
+                self._submit_parquet_uploads(bucket_name, extraction_data, uploads)
+            
+            bytes_uploaded = self._wait_for_uploads(uploads)
+            
+            # The manifest goes last so it never lists a page object that is not there yet
+            manifest = {
+                'source_file': extraction_data['metadata']['source_file'],
+                'document_key': document_key,
+                'document_title': extraction_data['metadata']['document_title'],
+                'updated_at': datetime.now().isoformat(),
+                'extraction_summary': {
+                    "total_pages": extraction_data['metadata']['total_pages'],
+                    "auto_healing_scenarios": len(extraction_data['auto_healing_scenarios']),
+                    "high_priority_scenarios": len(extraction_data['high_priority_content']),
+                    "training_examples": len(extraction_data['training_examples']),
+                    "aws_services_found": extraction_data['aws_services_found'],
+                    "total_text_length": len(extraction_data['consolidated_text']),
+                    "pages_uploaded": page_uploads
+                },
+                'pages': manifest_pages
+            }
+            if 'deduplication' in extraction_data['metadata']:
+                manifest['extraction_summary']['deduplication'] = extraction_data['metadata']['deduplication']
+            bytes_uploaded += self._put_bytes(bucket_name, f"{folder_name}/manifest.json",
+                                              json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'),
+                                              'application/json')
+            
+            # Page objects of the previous version that are no longer listed
+            stale_keys = sorted(previous_keys - {page['key'] for page in manifest_pages})
+            for start in range(0, len(stale_keys), 1000):
+                self.s3_client.delete_objects(
+                    Bucket=bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in stale_keys[start:start + 1000]], 'Quiet': True}
+                )
+            
+            self._record_upload(extraction_data, bucket_name, folder_name, len(uploads) + 1, bytes_uploaded, started)
+            self.reporter.success(f"✅ Uploaded {page_uploads} of {len(manifest_pages)} pages to "
+                                  f"s3://{bucket_name}/{folder_name}/ (manifest updated)")
+            return True
+            
+        except ClientError as e:
+            self.reporter.error(f"Error uploading to S3: {e}")
+            return False
+
+class TrainingExampleDeduplicator:
+    # Drops training examples that are near-duplicates of one kept earlier, in the same document or
+    # in any document deduplicated before. Examples are compared by MinHash signatures of their word
+    # shingles; LSH splits each signature into bands and only examples sharing a band bucket are
+    # compared, so checking an example costs BANDS index lookups however large the corpus grows.
+    # Kept signatures persist in SQLite. A reprocessed document first withdraws its own previous
+    # examples, so a new version is never deduplicated against the version it replaces. Documents
+    # are identified by document_key(), stored in the examples table's source_file column.
+    NUM_PERM = 128
+    BANDS = 16
+    SHINGLE_SIZE = 3
+    THRESHOLD = 0.8
+    # Bump when the signature parameters change; existing signatures are then discarded
+    SIGNATURE_VERSION = 2
+    # Input lines every example of a type shares (see build_training_examples). Like the instruction
+    # they are left out of the shingles, where they would dominate the similarity of short examples.
+    SERVICES_PREFIX = "AWS Services: "
+    TEMPLATE_LINES = ("Context: Auto healing scenario",)
+    _MERSENNE_PRIME = (1 << 61) - 1
+    _MAX_HASH = (1 << 32) - 1
+
+    def __init__(self, path: Optional[Path] = None, threshold: float = THRESHOLD):
+        self.path = Path(path or os.environ.get('PDF_PROCESSOR_DEDUP_PATH', CACHE_DIR / 'training_dedup.sqlite3'))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.rows = self.NUM_PERM // self.BANDS
+        # A fixed seed keeps signatures comparable with those stored by earlier runs
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, self._MERSENNE_PRIME, size=self.NUM_PERM, dtype=np.uint64)
+        self._b = rng.randint(0, self._MERSENNE_PRIME, size=self.NUM_PERM, dtype=np.uint64)
+        
+        with closing(self._connect()) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.SIGNATURE_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS lsh_buckets; DROP TABLE IF EXISTS examples;")
+            conn.executescript(f"""
+                PRAGMA journal_mode = WAL;
+                CREATE TABLE IF NOT EXISTS examples (
+                    example_id INTEGER PRIMARY KEY,
+                    source_file TEXT NOT NULL,
+                    signature BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS examples_source_file ON examples (source_file);
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    example_id INTEGER NOT NULL,
+                    PRIMARY KEY (band, bucket, example_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS lsh_buckets_example_id ON lsh_buckets (example_id);
+                PRAGMA user_version = {self.SIGNATURE_VERSION};
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, so deduplicate() can hold the write lock for the whole document
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def signature(self, text: str, services: List[str] = ()) -> np.ndarray:
+        words = re.findall(r'\w+', fold_case(text))
+        size = self.SHINGLE_SIZE
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        # Each service is one shingle, so a long service list cannot outweigh the text
+        shingles.update(f"service:{service}" for service in services)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+             for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        # One universal hash per permutation; uint64 overflow in a * h is part of the hash
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(self._MERSENNE_PRIME) & np.uint64(self._MAX_HASH)
+        return permuted.min(axis=0)
+
+    def _band_buckets(self, signature: np.ndarray, instruction: str) -> List[int]:
+        # Buckets are scoped by instruction, so examples are only compared with examples of their type
+        scope = instruction.encode('utf-8')
+        return [int.from_bytes(hashlib.blake2b(scope + band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+                for band in signature.reshape(self.BANDS, self.rows)]
+
+    def _example_features(self, example: Dict[str, Any]):
+        # Returns (text, services): the parts of the example that vary between examples of a type
+        services = []
+        varying_lines = []
+        for line in example['input'].split("\n"):
+            if line.startswith(self.SERVICES_PREFIX):
+                services = [service for service in line[len(self.SERVICES_PREFIX):].split(", ") if service]
+            elif line not in self.TEMPLATE_LINES:
+                varying_lines.append(line)
+        varying_lines.append(example['output'])
+        return "\n".join(varying_lines), services
+
+    def _find_duplicate(self, conn: sqlite3.Connection, signature: np.ndarray, buckets: List[int],
+                        document_key: str) -> Optional[str]:
+        # Returns the document key of a kept example similar enough to this one. A match in the
+        # document itself wins over other documents, and otherwise the earliest kept example does,
+        # so the within/across split does not depend on the order candidates come back in.
+        candidates = set()
+        for band, bucket in enumerate(buckets):
+            candidates.update(row[0] for row in conn.execute(
+                "SELECT example_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+        
+        duplicate_of = None
+        for example_id in sorted(candidates):
+            kept_document_key, stored = conn.execute(
+                "SELECT source_file, signature FROM examples WHERE example_id = ?", (example_id,)).fetchone()
+            similarity = np.count_nonzero(np.frombuffer(stored, dtype=np.uint64) == signature) / self.NUM_PERM
+            if similarity >= self.threshold:
+                if kept_document_key == document_key:
+                    return kept_document_key
+                duplicate_of = duplicate_of or kept_document_key
+        return duplicate_of
+
+    def deduplicate(self, extraction_data: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        metadata = extraction_data['metadata']
+        document_key = metadata['document_key']
+        examples = extraction_data['training_examples']
+        kept = []
+        within_document = 0
+        across_documents = 0
+        
+        # Signatures are CPU-bound, so they are computed before taking the corpus-wide write lock
+        signatures = []
+        for example in examples:
+            signature = self.signature(*self._example_features(example))
+            signatures.append((signature, self._band_buckets(signature, example['instruction'])))
+        
+        with closing(self._connect()) as conn:
+            # Documents deduplicated concurrently (batch workers) take turns, so each sees the others
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM lsh_buckets WHERE example_id IN "
+                             "(SELECT example_id FROM examples WHERE source_file = ?)", (document_key,))
+                conn.execute("DELETE FROM examples WHERE source_file = ?", (document_key,))
+                
+                for example, (signature, buckets) in zip(examples, signatures):
+                    duplicate_of = self._find_duplicate(conn, signature, buckets, document_key)
+                    if duplicate_of == document_key:
+                        within_document += 1
+                    elif duplicate_of is not None:
+                        across_documents += 1
+                    else:
+                        example_id = conn.execute("INSERT INTO examples (source_file, signature) VALUES (?, ?)",
+                                                  (document_key, signature.tobytes())).lastrowid
+                        conn.executemany("INSERT OR IGNORE INTO lsh_buckets (band, bucket, example_id) VALUES (?, ?, ?)",
+                                         [(band, bucket, example_id) for band, bucket in enumerate(buckets)])
+                        kept.append(example)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        
+        extraction_data['training_examples'] = kept
+        if 'page_records' in extraction_data:
+            assign_page_training_examples(extraction_data)
+        
+        stats = {
+            'examples_in': len(examples),
+            'examples_kept': len(kept),
+            'duplicates_within_document': within_document,
+            'duplicates_across_documents': across_documents,
+            'similarity_threshold': self.threshold
+        }
+        metadata['deduplication'] = stats
+        metadata['stage_timings']['deduplication'] = time.perf_counter() - started
+        log_event('deduplication', source_file=metadata['source_file'], document_key=document_key, **stats)
+        return stats
+
+class RunbookIndex:
+    # Local SQLite FTS5 index over every processed page. Page text, detected services and content
+    # types are separate FTS columns so bm25 can weight a service or category hit above a passing
+    # mention in the text. Re-indexing a document replaces its pages; documents are identified by
+    # document_key(), which search results show as source_file. Each call opens and closes its own
+    # connection, so searches from Streamlit sessions and the indexing thread never share one.
+    MAX_PAGES_PER_DOCUMENT = 100000
+    BM25_WEIGHTS = (1.0, 5.0, 2.0)
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.environ.get('PDF_PROCESSOR_INDEX_PATH', CACHE_DIR / 'runbook_index.sqlite3'))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.available = True
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executescript("""
+                    PRAGMA journal_mode = WAL;
+                    CREATE TABLE IF NOT EXISTS documents (
+                        doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        source_file TEXT UNIQUE NOT NULL,
+                        document_title TEXT,
+                        total_pages INTEGER,
+                        indexed_at TEXT
+                    );
+                    CREATE TABLE IF NOT EXISTS page_meta (
+                        page_rowid INTEGER PRIMARY KEY,
+                        doc_id INTEGER NOT NULL,
+                        page_number INTEGER NOT NULL,
+                        priority_score INTEGER NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS page_services (
+                        service TEXT NOT NULL,
+                        page_rowid INTEGER NOT NULL,
+                        PRIMARY KEY (service, page_rowid)
+                    ) WITHOUT ROWID;
+                    CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+                        text, services, content_types, tokenize = 'porter unicode61'
+                    );
+                """)
+        except sqlite3.OperationalError as e:
+            # Python builds without FTS5 still run; search is just unavailable
+            logger.warning("Runbook index disabled: %s", e)
+            self.available = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _iter_pages(extraction_data: Dict[str, Any]):
+        # Yields (page_number, text, scenario or None) for every page of the document
+        text = extraction_data['consolidated_text']
+        scenarios_by_page = {scenario.page_number: scenario for scenario in extraction_data['auto_healing_scenarios']}
+        page_offsets = extraction_data.get('page_offsets')
+        if not page_offsets:
+            # Results cached before page offsets were recorded only locate their scenario pages
+            for page_number, scenario in scenarios_by_page.items():
+                yield page_number, scenario.text_content, scenario
+            return
+        
+        separator = len(PageTextJoiner.SEPARATOR)
+        for index, start in enumerate(page_offsets):
+            end = page_offsets[index + 1] - separator if index + 1 < len(page_offsets) else len(text)
+            yield index + 1, text[start:end], scenarios_by_page.get(index + 1)
+
+    def index_document(self, extraction_data: Dict[str, Any]) -> int:
+        if not self.available:
+            return 0
+        metadata = extraction_data['metadata']
+        
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO documents (source_file, document_title, total_pages, indexed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source_file) DO UPDATE SET document_title = excluded.document_title, "
+                "total_pages = excluded.total_pages, indexed_at = excluded.indexed_at",
+                (metadata['document_key'], metadata.get('document_title'), metadata['total_pages'],
+                 datetime.now().isoformat())
+            )
+            doc_id = conn.execute("SELECT doc_id FROM documents WHERE source_file = ?",
+                                  (metadata['document_key'],)).fetchone()['doc_id']
+            
+            # Page rowids are allocated per document, so replacing a document is a range delete
+            first_rowid = doc_id * self.MAX_PAGES_PER_DOCUMENT
+            last_rowid = first_rowid + self.MAX_PAGES_PER_DOCUMENT - 1
+            conn.execute("DELETE FROM pages WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+            conn.execute("DELETE FROM page_meta WHERE page_rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+            conn.execute("DELETE FROM page_services WHERE page_rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+            
+            indexed = 0
+            for page_number, page_text, scenario in self._iter_pages(extraction_data):
+                if page_number >= self.MAX_PAGES_PER_DOCUMENT or not page_text.strip():
+                    continue
+                page_rowid = first_rowid + page_number
+                services = scenario.aws_services if scenario else []
+                content_types = scenario.auto_healing_analysis['content_types'] if scenario else []
+                conn.execute("INSERT INTO pages (rowid, text, services, content_types) VALUES (?, ?, ?, ?)",
+                             (page_rowid, page_text, " ".join(services), " ".join(content_types)))
+                conn.execute("INSERT INTO page_meta (page_rowid, doc_id, page_number, priority_score) "
+                             "VALUES (?, ?, ?, ?)",
+                             (page_rowid, doc_id, page_number, scenario.priority_score if scenario else 0))
+                conn.executemany("INSERT OR IGNORE INTO page_services (service, page_rowid) VALUES (?, ?)",
+                                 [(service, page_rowid) for service in services])
+                indexed += 1
+        
+        log_event('index', source_file=metadata['source_file'], document_key=metadata['document_key'],
+                  pages_indexed=indexed)
+        return indexed
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        # Every word becomes a quoted term, so user input never hits FTS5 query syntax errors
+        terms = re.findall(r'\w+', query)
+        return " ".join(f'"{term}"' for term in terms)
+
+    def search(self, query: str, service: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        if not self.available:
+            return []
+        match_expression = self._match_expression(query)
+        service_filter = " AND m.page_rowid IN (SELECT page_rowid FROM page_services WHERE service = ?)" if service else ""
+        
+        with closing(self._connect()) as conn, conn:
+            if match_expression:
+                params = [match_expression] + ([service] if service else []) + [limit]
+                rows = conn.execute(
+                    "SELECT d.source_file, m.page_number, m.priority_score, pages.services, "
+                    "snippet(pages, 0, '**', '**', '…', 16) AS snippet, "
+                    f"bm25(pages, {', '.join(str(weight) for weight in self.BM25_WEIGHTS)}) AS score "
+                    "FROM pages JOIN page_meta m ON m.page_rowid = pages.rowid "
+                    "JOIN documents d ON d.doc_id = m.doc_id "
+                    f"WHERE pages MATCH ?{service_filter} ORDER BY score LIMIT ?",
+                    params
+                ).fetchall()
+            elif service:
+                # A service on its own lists that service's pages, most relevant first
+                rows = conn.execute(
+                    "SELECT d.source_file, m.page_number, m.priority_score, pages.services, "
+                    "substr(pages.text, 1, 200) AS snippet, -m.priority_score AS score "
+                    "FROM page_meta m JOIN pages ON pages.rowid = m.page_rowid "
+                    "JOIN documents d ON d.doc_id = m.doc_id "
+                    f"WHERE 1{service_filter} ORDER BY m.priority_score DESC LIMIT ?",
+                    [service, limit]
+                ).fetchall()
+            else:
+                return []
+        return [dict(row) for row in rows]
+
+    def services(self) -> List[str]:
+        if not self.available:
+            return []
+        with closing(self._connect()) as conn, conn:
+            return [row['service'] for row in conn.execute("SELECT DISTINCT service FROM page_services ORDER BY service")]
+
+    def stats(self) -> Dict[str, int]:
+        if not self.available:
+            return {'documents': 0, 'pages': 0}
+        with closing(self._connect()) as conn, conn:
+            return {
+                'documents': conn.execute("SELECT count(*) FROM documents").fetchone()[0],
+                'pages': conn.execute("SELECT count(*) FROM page_meta").fetchone()[0]
+            }
+
+class RunbookIndexer:
+    # Feeds finished documents into a RunbookIndex on a background thread, so indexing never
+    # holds up extraction or the S3 upload
+    def __init__(self, index: RunbookIndex):
+        self.index = index
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='runbook-indexer', daemon=True)
+        self._thread.start()
+
+    def submit(self, extraction_data: Dict[str, Any]) -> None:
+        if self.index.available:
+            self._queue.put(extraction_data)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            extraction_data = self._queue.get()
+            try:
+                self.index.index_document(extraction_data)
+            except Exception as e:
+                logger.error("Indexing %s failed: %s", extraction_data['metadata'].get('source_file'), e)
+            finally:
+                self._queue.task_done()
+
+class ProcessingJob:
+    ACTIVE_STATUSES = ('queued', 'running', 'uploading')
+
+    def __init__(self, file_name: str, bucket_name: str, page_workers: int, ocr_mode: str = 'auto',
+                 incremental: bool = False, columnar: bool = False, deduplicate: bool = False):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.file_name = file_name
+        self.bucket_name = bucket_name
+        self.page_workers = page_workers
+        self.ocr_mode = ocr_mode
+        self.incremental = incremental
+        self.columnar = columnar
+        self.deduplicate = deduplicate
+        self.status = 'queued'
+        self.pages_done = 0
+        self.total_pages = 0
+        self.messages = []
+        self.extraction_data = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    def is_active(self) -> bool:
+        return self.status in self.ACTIVE_STATUSES
+
+class JobReporter(ProcessingReporter):
+    # Records progress on the job for the UI to poll, and stops the extraction at the next
+    # page boundary once the job has been cancelled
+    def __init__(self, job: ProcessingJob):
+        self.job = job
+
+    def progress(self, page_number: int, total_pages: int, priority_score: int) -> None:
+        self.job.pages_done = page_number
+        self.job.total_pages = total_pages
+        if self.job.cancel_event.is_set():
+            raise ProcessingCancelled()
+
+    def info(self, message: str) -> None:
+        self.job.messages.append(('info', message))
+
+    def success(self, message: str) -> None:
+        self.job.messages.append(('success', message))
+
+    def warning(self, message: str) -> None:
+        self.job.messages.append(('warning', message))
+
+    def error(self, message: str) -> None:
+        self.job.messages.append(('error', message))
+
+class JobQueue:
+    # Runs uploads in the background of the Streamlit server process. At most max_concurrent_jobs
+    # documents are extracted at once, each with a share of the CPUs, so simultaneous uploads
+    # queue up instead of oversubscribing the machine with Tesseract processes.
+    # Finished jobs hold their whole extraction result, so they are kept for FINISHED_JOB_TTL
+    # seconds and at most MAX_FINISHED_JOBS of them; after that their sessions simply stop listing them.
+    MAX_FINISHED_JOBS = 20
+    FINISHED_JOB_TTL = 3600
+
+    def __init__(self, max_concurrent_jobs: int = 2, ocr_cache: Optional[OCRCache] = None,
+                 result_cache: Optional[ResultCache] = None, indexer: Optional[RunbookIndexer] = None,
+                 deduplicator: Optional[TrainingExampleDeduplicator] = None):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.page_workers = max(1, (os.cpu_count() or 1) // max_concurrent_jobs)
+        self.ocr_cache = ocr_cache
+        self.result_cache = result_cache
+        self.indexer = indexer
+        self.deduplicator = deduplicator
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix='pdf-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._s3_client = None
+
+    def submit(self, pdf_bytes: bytes, file_name: str, bucket_name: str, page_workers: Optional[int] = None,
+               ocr_mode: str = 'auto', incremental: bool = False, columnar: bool = False,
+               deduplicate: bool = False) -> str:
+        page_workers = min(page_workers or self.page_workers, self.page_workers)
+        job = ProcessingJob(file_name, bucket_name, page_workers, ocr_mode, incremental, columnar,
+                            deduplicate and self.deduplicator is not None)
+        with self._lock:
+            self._prune_finished_jobs()
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, pdf_bytes)
+        return job.job_id
+
+    def _prune_finished_jobs(self) -> None:
+        # Called with the lock held
+        now = datetime.now()
+        finished = sorted((job for job in self._jobs.values() if job.finished_at is not None),
+                          key=lambda job: job.finished_at, reverse=True)
+        for index, job in enumerate(finished):
+            if index >= self.MAX_FINISHED_JOBS or (now - job.finished_at).total_seconds() > self.FINISHED_JOB_TTL:
+                del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[ProcessingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.cancel_event.set()
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished_at = datetime.now()
+
+    def _get_s3_client(self):
+        # boto3 client creation is not thread-safe, but a created client can be shared
+        with self._lock:
+            if self._s3_client is None:
+                self._s3_client = boto3.client('s3')
+            return self._s3_client
+
+    def _run(self, job: ProcessingJob, pdf_bytes: bytes) -> None:
+        if job.cancel_event.is_set():
+            job.status = 'cancelled'
+            job.finished_at = job.finished_at or datetime.now()
+            return
+        
+        job.status = 'running'
+        reporter = JobReporter(job)
+        s3_manager = S3Manager(s3_client=self._get_s3_client(), reporter=reporter)
+        pdf_name = Path(job.file_name).stem
+        # Uploads have no folder, so the same file name always refers to the same document
+        job_document_key = document_key(Path(job.file_name).name)
+        previous_manifest = None
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # Keep the uploaded file name so the metadata refers to the real document
+                pdf_path = os.path.join(tmp_dir, Path(job.file_name).name)
+                with open(pdf_path, 'wb') as pdf_file:
+                    pdf_file.write(pdf_bytes)
+                
+                # Concurrent jobs and their page workers share the CPUs with the OCR engine pools
+                ocr_threads = max(1, (os.cpu_count() or 1) // (self.max_concurrent_jobs * job.page_workers))
+                extractor = AWSAutoHealingExtractor(max_workers=job.page_workers, ocr_cache=self.ocr_cache,
+                                                    result_cache=self.result_cache, ocr_mode=job.ocr_mode,
+                                                    ocr_threads=ocr_threads)
+                if job.incremental:
+                    fingerprints = extractor.fingerprint_pages(pdf_path)
+                    previous_manifest, previous_pages = s3_manager.load_previous_pages(
+                        job.bucket_name, job_document_key, fingerprints)
+                    extraction_data = extractor.process_pdf_incremental(pdf_path, previous_pages, reporter,
+                                                                        fingerprints)
+                else:
+                    extraction_data = extractor.process_pdf_for_auto_healing(pdf_path, reporter)
+            
+            if extraction_data is None:
+                job.status = 'failed'
+                METRICS.record_document(None, 'failed')
+                return
+            
+            if job.deduplicate:
+                self.deduplicator.deduplicate(extraction_data)
+            METRICS.record_document(extraction_data,
+                                    'cached' if extraction_data['metadata'].get('result_cache_hit') else 'processed')
+            job.extraction_data = extraction_data
+            job.pages_done = job.total_pages = extraction_data['metadata']['total_pages']
+            if self.indexer is not None:
+                self.indexer.submit(extraction_data)
+            job.status = 'uploading'
+            
+            if job.incremental:
+                uploaded = s3_manager.upload_incremental_training_data(job.bucket_name, extraction_data,
+                                                                       previous_manifest, job.columnar)
+            else:
+                uploaded = s3_manager.upload_training_data_to_s3(job.bucket_name, extraction_data, pdf_name,
+                                                                 job.columnar)
+            if uploaded:
+                METRICS.record_upload(extraction_data)
+                job.status = 'done'
+            else:
+                METRICS.inc('uploads_failed_total')
+                job.status = 'failed'
+        
+        except ProcessingCancelled:
+            METRICS.inc('documents_total', status='cancelled')
+            job.status = 'cancelled'
+        except Exception as e:
+            METRICS.inc('documents_total', status='failed')
+            reporter.error(f"Error processing PDF: {e}")
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.now()
+            METRICS.write_textfile()
@@ -0,0 +1,274 @@
+# batch_process.py - Headless bulk conversion of runbook PDFs into auto-healing training data
+#
+# Usage:
+#   python batch_process.py ./runbooks --bucket my-training-bucket
+#   python batch_process.py s3://runbook-archive/2024/ --bucket my-training-bucket --workers 8
+#
+# Completed documents are appended to a checkpoint file, so an interrupted run picks up where it
+# stopped when started again with the same checkpoint.
+#
+# With --incremental, each document keeps a manifest under training_data/{document_key}/ and a
+# revised version only reprocesses and uploads the pages that changed since the previous run. The
+# document key is the PDF's path below the source directory or prefix, without the .pdf suffix.
+#
+# Set PDF_PROCESSOR_METRICS_FILE to have per-stage timings and counters written in the Prometheus
+# text format after every document.
+# Set PDF_PROCESSOR_METRICS_LOG to a file (or '-' for stderr) to also get one JSON line per page,
+# document and upload event.
+#
+# With --index, every uploaded document is also added to the local SQLite full-text index that the
+# app's Search tab queries (PDF_PROCESSOR_INDEX_PATH overrides its location).
+#
+# With --dedup, training examples that are near-duplicates of one already kept, from the same or an
+# earlier document, are dropped before upload. Kept examples are remembered in a local SQLite file
+# (PDF_PROCESSOR_DEDUP_PATH) so later runs deduplicate against them too.
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set
+
+import boto3
+
+from aws_auto_healing_extractor import (METRICS, OCR_BACKENDS, AWSAutoHealingExtractor, OCRPolicy, RunbookIndex,
+                                        S3Manager, TrainingExampleDeduplicator, document_key)
+
+logger = logging.getLogger("batch_process")
+
+# Created once per worker process and reused for every document it handles
+_extractor = None
+_s3_manager = None
+_incremental = False
+_columnar = False
+_index = None
+_deduplicator = None
+
+def _init_worker(page_workers: int, ocr_threads: int, ocr_mode: str, ocr_backend: str, incremental: bool,
+                 columnar: bool, index: bool, dedup_threshold: Optional[float]) -> None:
+    global _extractor, _s3_manager, _incremental, _columnar, _index, _deduplicator
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    _extractor = AWSAutoHealingExtractor(max_workers=page_workers, ocr_mode=ocr_mode, ocr_backend=ocr_backend,
+                                         ocr_threads=ocr_threads)
+    _s3_manager = S3Manager()
+    _incremental = incremental
+    _columnar = columnar
+    # Workers write to the same SQLite file; each write is one short transaction
+    _index = RunbookIndex() if index else None
+    _deduplicator = TrainingExampleDeduplicator(threshold=dedup_threshold) if dedup_threshold is not None else None
+
+def _split_s3_url(url: str):
+    bucket, _, key = url[len("s3://"):].partition('/')
+    return bucket, key
+
+def list_sources(source: str) -> List[str]:
+    if source.startswith("s3://"):
+        bucket, prefix = _split_s3_url(source)
+        paginator = boto3.client('s3').get_paginator('list_objects_v2')
+        sources = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'].lower().endswith('.pdf'):
+                    sources.append(f"s3://{bucket}/{obj['Key']}")
+        return sorted(sources)
+
+    return sorted(str(path) for path in Path(source).rglob('*') if path.suffix.lower() == '.pdf')
+
+def relative_source_path(source: str, root: str) -> str:
+    # Path of a listed PDF below the directory or S3 prefix it was found under
+    if source.startswith("s3://"):
+        key = _split_s3_url(source)[1]
+        # A prefix matches keys as plain strings, so paths are taken from its last '/'
+        folder = _split_s3_url(root)[1].rpartition('/')[0]
+        return key[len(folder):].lstrip('/')
+    return Path(source).relative_to(root).as_posix()
+
+def load_checkpoint(checkpoint_path: Path) -> Set[str]:
+    completed = set()
+    if not checkpoint_path.exists():
+        return completed
+
+    with open(checkpoint_path, encoding='utf-8') as checkpoint_file:
+        for line in checkpoint_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            if record.get('status') == 'done':
+                completed.add(record['source'])
+    return completed
+
+def append_checkpoint(checkpoint_path: Path, record: Dict[str, Any]) -> None:
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint_file:
+        checkpoint_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+
+def upload_document(bucket_name: str, extraction_data: Dict[str, Any], pdf_name: str,
+                    previous_manifest: Optional[Dict[str, Any]]) -> bool:
+    if _incremental:
+        return _s3_manager.upload_incremental_training_data(bucket_name, extraction_data, previous_manifest, _columnar)
+    return _s3_manager.upload_training_data_to_s3(bucket_name, extraction_data, pdf_name, _columnar)
+
+def process_document(source: str, bucket_name: str, doc_key: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    pdf_name = Path(source).stem
+    record = {'source': source, 'status': 'failed', 'pages': 0}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if source.startswith("s3://"):
+            source_bucket, key = _split_s3_url(source)
+            pdf_path = os.path.join(tmp_dir, Path(key).name)
+            _s3_manager.s3_client.download_file(source_bucket, key, pdf_path)
+        else:
+            pdf_path = source
+
+        previous_manifest = None
+        if _incremental:
+            fingerprints = _extractor.fingerprint_pages(pdf_path)
+            previous_manifest, previous_pages = _s3_manager.load_previous_pages(bucket_name, doc_key, fingerprints)
+            extraction_data = _extractor.process_pdf_incremental(pdf_path, previous_pages, fingerprints=fingerprints)
+        else:
+            extraction_data = _extractor.process_pdf_for_auto_healing(pdf_path)
+        if extraction_data is not None:
+            extraction_data['metadata']['document_key'] = doc_key
+            if _deduplicator is not None:
+                _deduplicator.deduplicate(extraction_data)
+
+        if extraction_data is None:
+            record['error'] = "extraction failed"
+        elif not upload_document(bucket_name, extraction_data, pdf_name, previous_manifest):
+            record['error'] = "upload failed"
+        else:
+            record.update({
+                'status': 'done',
+                'pages': extraction_data['metadata']['total_pages'],
+                'scenarios': len(extraction_data['auto_healing_scenarios']),
+                'training_examples': len(extraction_data['training_examples'])
+            })
+            if _incremental:
+                record['pages_reprocessed'] = extraction_data['metadata']['pages_reprocessed']
+            if _index is not None:
+                # After the upload, so a slow index write never holds up the training data
+                try:
+                    record['pages_indexed'] = _index.index_document(extraction_data)
+                except Exception as e:
+                    logger.error("Indexing %s failed: %s", source, e)
+
+        # Timings and counters travel back to the parent, which owns the metrics file
+        if extraction_data is not None:
+            record['metadata'] = {field: value for field, value in extraction_data['metadata'].items()
+                                  if field in ('total_pages', 'pages_reused', 'result_cache_hit', 'ocr_cache',
+                                               'stage_timings', 'processing_seconds', 'bytes_uploaded',
+                                               'deduplication')}
+
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a directory or S3 prefix of runbook PDFs into training data")
+    parser.add_argument('source', help="Local directory or s3://bucket/prefix containing PDFs")
+    parser.add_argument('--bucket', required=True, help="S3 bucket that receives the training data")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Documents processed concurrently")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Page worker processes per document (keep at 1 when --workers is high)")
+    parser.add_argument('--ocr-mode', choices=OCRPolicy.MODES, default='auto',
+                        help="never: text layer only, auto: skip images unlikely to add text, always: OCR every image")
+    parser.add_argument('--ocr-backend', choices=OCR_BACKENDS, default='auto',
+                        help="auto uses persistent tesserocr engines when installed, otherwise the tesseract CLI")
+    parser.add_argument('--ocr-threads', type=int, default=None,
+                        help="Tesseract engines per page worker (default: CPUs left after --workers and --page-workers)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Reuse unchanged pages from the previous run's manifest and upload only changed pages")
+    parser.add_argument('--parquet', action='store_true',
+                        help="Also write training examples and scenarios as Parquet under training_data_parquet/ "
+                             "(requires pyarrow)")
+    parser.add_argument('--index', action='store_true',
+                        help="Also add each uploaded document to the local full-text search index")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop training examples that are near-duplicates of ones kept from this or earlier documents")
+    parser.add_argument('--dedup-threshold', type=float, default=TrainingExampleDeduplicator.THRESHOLD,
+                        help="Estimated Jaccard similarity at which --dedup treats two examples as duplicates")
+    parser.add_argument('--checkpoint', type=Path, default=Path('batch_checkpoint.jsonl'),
+                        help="File recording completed documents, used to resume interrupted runs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    sources = list_sources(args.source)
+    completed = load_checkpoint(args.checkpoint)
+    pending = [source for source in sources if source not in completed]
+    logger.info("Found %d PDFs, %d already completed, %d to process", len(sources), len(sources) - len(pending), len(pending))
+
+    if not pending:
+        return 0
+
+    # Documents, page workers and OCR engines share the CPUs; with the defaults every level but
+    # the documents runs single-threaded
+    ocr_threads = args.ocr_threads or max(1, (os.cpu_count() or 1) // (args.workers * args.page_workers))
+
+    started = time.perf_counter()
+    done_docs = 0
+    failed_docs = 0
+    total_pages = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.page_workers, ocr_threads, args.ocr_mode, args.ocr_backend,
+                                       args.incremental, args.parquet, args.index,
+                                       args.dedup_threshold if args.dedup else None)) as executor:
+        futures = {executor.submit(process_document, source, args.bucket,
+                                   document_key(relative_source_path(source, args.source))): source
+                   for source in pending}
+
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'source': futures[future], 'status': 'failed', 'pages': 0, 'error': str(e)}
+
+            append_checkpoint(args.checkpoint, record)
+
+            document = {'metadata': record['metadata']} if 'metadata' in record else None
+            if document is not None and record['metadata'].get('result_cache_hit'):
+                METRICS.record_document(document, 'cached')
+            else:
+                METRICS.record_document(document, 'processed' if document is not None else 'failed')
+            if record['status'] == 'done':
+                METRICS.record_upload(document)
+            elif document is not None:
+                METRICS.inc('uploads_failed_total')
+            METRICS.write_textfile()
+
+            if record['status'] == 'done':
+                done_docs += 1
+                total_pages += record['pages']
+            else:
+                failed_docs += 1
+                logger.error("Failed %s: %s", record['source'], record.get('error'))
+
+            elapsed = time.perf_counter() - started
+            logger.info("[%d/%d] %s (%d pages, %.1fs) | %.2f pages/sec, %.2f docs/min",
+                        done_docs + failed_docs, len(pending), record['source'], record['pages'],
+                        record.get('seconds', 0.0), total_pages / elapsed, done_docs * 60 / elapsed)
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'documents_completed': done_docs,
+        'documents_failed': failed_docs,
+        'pages': total_pages,
+        'elapsed_seconds': round(elapsed, 2),
+        'pages_per_second': round(total_pages / elapsed, 2),
+        'docs_per_minute': round(done_docs * 60 / elapsed, 2)
+    }, indent=2))
+
+    return 1 if failed_docs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
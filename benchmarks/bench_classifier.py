@@ -0,0 +1,112 @@
+# bench_classifier.py - Compare the precompiled PatternClassifier with the original per-call regex scans
+#
+# Category counts and services must match the legacy scans exactly. Steps and commands come from
+# ProcedureParser since PATTERN_VERSION 2 and are only timed against the legacy regexes.
+#
+# Usage: python benchmarks/bench_classifier.py [--pages 200] [--words 800]
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aws_auto_healing_extractor import AWSAutoHealingExtractor, fold_case
+
+VOCABULARY = (
+    "the instance failed health check so restart the service and verify the CloudWatch alarm threshold "
+    "run aws ec2 describe-instances then check the status of the RDS failover snapshot and backup "
+    "download the latest configuration Lambda function trigger schedule cron event driven Auto Scaling "
+    "capacity memory cpu load timeout connection refused access denied not found unavailable outage "
+    "troubleshoot diagnose investigate debug validate test rollback retry workaround remediation resolve "
+    "API Gateway Step Functions Systems Manager Parameter Store Secrets Manager Elastic Beanstalk Fargate "
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore"
+).split()
+
+def synthetic_page(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(VOCABULARY))
+        roll = rng.random()
+        if roll < 0.06:
+            parts.append("\n")
+        elif roll < 0.08:
+            parts.append(f"\n{rng.randint(1, 9)}. ")
+        elif roll < 0.09:
+            parts.append("\n$ aws s3 ls s3://runbook-bucket\n")
+    return " ".join(parts)
+
+# The step and command regexes that ProcedureParser replaced
+LEGACY_STEP_PATTERNS = [
+    r'(?i)(?:step\s*)?(\d+)[\.\:\-\s]+([^\n]+(?:\n(?!\s*(?:step\s*)?\d+[\.\:\-])[^\n]*)*)',
+    r'(?i)(first|then|next|finally|lastly)[,\s]+([^\n\.]+)',
+]
+LEGACY_COMMAND_PATTERNS = [
+    r'(?:^|\n)\s*(?:\$\s*|aws\s+|sudo\s+|docker\s+|kubectl\s+|terraform\s+)([^\n]+)',
+    r'(?i)(aws\s+\w+\s+[^\n]+)',
+]
+
+def legacy_analysis(extractor: AWSAutoHealingExtractor, text: str):
+    # The scans process_page ran before the classifier existed
+    priority_score = 0
+    content_types = []
+    for pattern_type, pattern in extractor.auto_healing_patterns.items():
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            content_types.append(pattern_type)
+            priority_score += len(matches)
+    services = set(re.findall(extractor.aws_services_pattern, text, re.IGNORECASE))
+    steps = []
+    for pattern in LEGACY_STEP_PATTERNS:
+        steps.extend(re.findall(pattern, text, re.MULTILINE))
+    commands = []
+    for pattern in LEGACY_COMMAND_PATTERNS:
+        commands.extend(re.findall(pattern, text, re.MULTILINE))
+    return priority_score, content_types, services, steps, commands
+
+def classifier_analysis(extractor: AWSAutoHealingExtractor, text: str):
+    folded_text = fold_case(text)
+    analysis = extractor.identify_auto_healing_content(text, folded_text)
+    services = set(extractor.extract_aws_services(text, folded_text))
+    steps, commands = extractor.classifier.procedures(text, folded_text)
+    return analysis['priority_score'], analysis['content_types'], services, steps, commands
+
+def time_pages(analyse, extractor, pages, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in pages:
+            analyse(extractor, text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page pattern classifier")
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--words', type=int, default=800, help="Words per synthetic page")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [synthetic_page(rng, args.words) for _ in range(args.pages)]
+    extractor = AWSAutoHealingExtractor(max_workers=1)
+
+    for text in pages:
+        if legacy_analysis(extractor, text)[:3] != classifier_analysis(extractor, text)[:3]:
+            sys.exit("Classifier output differs from the legacy regex scans")
+
+    legacy_seconds = time_pages(legacy_analysis, extractor, pages, args.repeat)
+    classifier_seconds = time_pages(classifier_analysis, extractor, pages, args.repeat)
+    total_chars = sum(len(text) for text in pages)
+
+    print(f"pages: {len(pages)}  characters: {total_chars:,}")
+    print(f"legacy regex scans:  {legacy_seconds * 1000:8.1f} ms  ({len(pages) / legacy_seconds:8.1f} pages/s)")
+    print(f"pattern classifier:  {classifier_seconds * 1000:8.1f} ms  ({len(pages) / classifier_seconds:8.1f} pages/s)")
+    print(f"speedup: {legacy_seconds / classifier_seconds:.2f}x")
+
+if __name__ == "__main__":
+    main()
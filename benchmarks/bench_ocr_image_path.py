@@ -0,0 +1,120 @@
+# bench_ocr_image_path.py - Per-image latency and peak memory of the pixmap -> OCR input path
+#
+# Compares the original PNG round trip (Pixmap.tobytes("png") -> Image.open -> convert('RGB'))
+# with prepare_ocr_pixmap + pixmap_to_image, which hands the pixmap samples to PIL directly.
+# Each variant runs in a fresh process so peak RSS is not shared between them.
+#
+# Usage: python benchmarks/bench_ocr_image_path.py [--repeat 5] [--with-ocr] [--case-timeout 600]
+
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from aws_auto_healing_extractor import AWSAutoHealingExtractor, pixmap_to_image
+from bench_support import wait_for_result
+
+# (label, rendered width in pixels, colourspace)
+IMAGE_CASES = [
+    ("screenshot_rgb", 1200, fitz.csRGB),
+    ("a4_300dpi_rgb", 2480, fitz.csRGB),
+    ("a4_300dpi_cmyk", 2480, fitz.csCMYK),
+    ("oversized_scan_rgb", 5000, fitz.csRGB),
+    ("a4_300dpi_gray", 2480, fitz.csGRAY),
+]
+
+def render_runbook_image(width: int, colorspace) -> fitz.Pixmap:
+    # A page of runbook-like text rendered to a bitmap, like a scanned page embedded in a PDF
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 50
+    line = 0
+    while y < page.rect.height - 40:
+        page.insert_text((40, y), f"{line + 1}. Restart the EC2 instance and verify the CloudWatch alarm clears",
+                         fontsize=10)
+        y += 14
+        line += 1
+    zoom = width / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace)
+    doc.close()
+    return pix
+
+def png_round_trip(extractor: AWSAutoHealingExtractor, pix: fitz.Pixmap, with_ocr: bool):
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    image = image.convert('RGB')
+    image.load()
+    if with_ocr:
+        extractor._image_to_string(image)
+
+def direct_buffer(extractor: AWSAutoHealingExtractor, pix: fitz.Pixmap, with_ocr: bool):
+    ocr_pix = extractor.prepare_ocr_pixmap(pix)
+    image = pixmap_to_image(ocr_pix)
+    image.load()
+    if with_ocr:
+        extractor._image_to_string(image)
+
+VARIANTS = {'png_round_trip': png_round_trip, 'direct_buffer': direct_buffer}
+
+def _run_variant(variant: str, width: int, colorspace_name: str, repeat: int, with_ocr: bool, results):
+    colorspace = {'RGB': fitz.csRGB, 'CMYK': fitz.csCMYK, 'GRAY': fitz.csGRAY}[colorspace_name]
+    pix = render_runbook_image(width, colorspace)
+    extractor = AWSAutoHealingExtractor(max_workers=1)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        VARIANTS[variant](extractor, pix, with_ocr)
+        timings.append(time.perf_counter() - start)
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put({
+        'variant': variant,
+        'image_size': f"{pix.width}x{pix.height}x{pix.n}",
+        'best_ms': round(min(timings) * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_delta_mb': round((peak_rss - baseline_rss) / 1024, 1)
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pixmap to OCR image path")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--with-ocr', action='store_true', help="Include the Tesseract call in the timings")
+    parser.add_argument('--case-timeout', type=float, default=600, help="Seconds before a variant is abandoned")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    colorspace_names = {fitz.csRGB.name: 'RGB', fitz.csCMYK.name: 'CMYK', fitz.csGRAY.name: 'GRAY'}
+    report = []
+
+    for label, width, colorspace in IMAGE_CASES:
+        for variant in VARIANTS:
+            results = context.Queue()
+            process = context.Process(target=_run_variant, args=(variant, width, colorspace_names[colorspace.name],
+                                                                 args.repeat, args.with_ocr, results))
+            process.start()
+            result = wait_for_result(process, results, args.case_timeout)
+            process.join()
+            result['case'] = label
+            result.setdefault('variant', variant)
+            report.append(result)
+            if 'error' in result:
+                print(f"{label:20} {variant:15} failed: {result['error']}")
+                continue
+            print(f"{label:20} {variant:15} {result['image_size']:>16}  best {result['best_ms']:9.2f} ms  "
+                  f"mean {result['mean_ms']:9.2f} ms  peak RSS +{result['peak_rss_delta_mb']:7.1f} MB")
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+# bench_pipeline.py - Per-stage timings, throughput and peak memory of the extraction pipeline
+#
+# Generates a synthetic corpus of runbook PDFs (page count x images per page x words per page),
+# then times each stage on every document in a fresh process: text extraction, image decoding,
+# OCR and pattern analysis as process_page reports them, training-data generation and the S3
+# upload, followed by an end-to-end process_pdf_for_auto_healing run with cold caches. The report
+# is JSON so runs can be compared across commits.
+#
+# The upload goes to a local stand-in: a directory-backed client by default, moto's in-memory S3
+# with --s3 moto, or any S3-compatible server (MinIO, LocalStack) with
+# --s3 endpoint --s3-endpoint-url URL.
+#
+# Usage: python benchmarks/bench_pipeline.py [--pages 10,50] [--images 0,2] [--words 300,1200]
+#                                           [--output bench_pipeline.json] [--no-ocr]
+#                                           [--s3 local|moto|endpoint] [--case-timeout 3600]
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz  # PyMuPDF
+
+from aws_auto_healing_extractor import (OCR_STAT_COUNTERS, PAGE_STAGES, AWSAutoHealingExtractor, DocumentText,
+                                        OCRCache, PageTextJoiner, ResultCache, S3Manager, document_key)
+from bench_support import wait_for_result
+
+STAGES = PAGE_STAGES + ('training_generation', 's3_upload')
+
+SERVICES = ("EC2", "S3", "RDS", "Lambda", "CloudWatch", "Auto Scaling", "DynamoDB", "ECS", "SQS", "Route53")
+SENTENCES = (
+    "If the health check fails, restart the {service} service and verify the alarm clears.",
+    "A connection refused error usually means the {service} endpoint is unavailable.",
+    "Check the {service} metric dashboard and confirm the threshold notification was sent.",
+    "Rollback to the last snapshot when the {service} failover does not restore availability.",
+    "Scale up capacity when cpu or memory load stays above the alarm threshold for {service}.",
+    "The remediation runs as a scheduled Lambda function triggered by an EventBridge event.",
+    "Investigate the timeout in the {service} logs before you retry the deployment.",
+    "Access denied errors point to a missing IAM permission on the {service} role.",
+)
+COMMANDS = (
+    "$ aws ec2 reboot-instances --instance-ids i-0abc{n:04d}",
+    "aws cloudwatch describe-alarms --state-value ALARM",
+    "aws rds failover-db-cluster --db-cluster-identifier prod-{n}",
+    "sudo systemctl restart amazon-ssm-agent",
+    "kubectl rollout restart deployment/api-{n}",
+)
+
+class LocalS3Client:
+    # Directory-backed stand-in for the subset of the S3 client API that S3Manager uses, so the
+    # upload stage measures serialisation and I/O without a network round trip
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._uploads = {}
+
+    def _path(self, bucket: str, key: str) -> Path:
+        path = self.root / bucket / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._path(Bucket, Key).write_bytes(Body)
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = open(self._path(Bucket, Key), 'wb')
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._uploads[UploadId].write(Body)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._uploads.pop(UploadId).close()
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId).close()
+        return {}
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    lines = ["Runbook: restore service availability", ""]
+    word_count = 0
+    step = 1
+    while word_count < words:
+        roll = rng.random()
+        if roll < 0.55:
+            line = rng.choice(SENTENCES).format(service=rng.choice(SERVICES))
+        elif roll < 0.85:
+            line = f"{step}. " + rng.choice(SENTENCES).format(service=rng.choice(SERVICES))
+            step += 1
+        else:
+            line = rng.choice(COMMANDS).format(n=rng.randint(1, 9999))
+        lines.append(line)
+        word_count += len(line.split())
+    return "\n".join(lines)
+
+def render_image(rng: random.Random, width: int) -> fitz.Pixmap:
+    # A screenshot-like bitmap of runbook text; the text differs per image so repeated images
+    # do not collapse into one xref
+    doc = fitz.open()
+    page = doc.new_page(width=500, height=300)
+    page.insert_textbox(fitz.Rect(20, 20, 480, 280), synthetic_text(rng, 60), fontsize=11)
+    zoom = width / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB)
+    doc.close()
+    return pix
+
+def build_runbook_pdf(path: Path, pages: int, images_per_page: int, words: int, image_width: int, seed: int) -> None:
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        text_bottom = page.rect.height - 40
+        image_height = 0
+        if images_per_page:
+            image_height = min(180, (page.rect.height - 100) / (images_per_page + 1))
+            text_bottom -= image_height * images_per_page
+        page.insert_textbox(fitz.Rect(40, 40, page.rect.width - 40, text_bottom),
+                            synthetic_text(rng, words), fontsize=7)
+        for index in range(images_per_page):
+            top = text_bottom + index * image_height
+            page.insert_image(fitz.Rect(40, top, page.rect.width - 40, top + image_height - 4),
+                              pixmap=render_image(rng, image_width))
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def make_s3_client(mode: str, endpoint_url: str, root: Path):
+    if mode == 'local':
+        return LocalS3Client(root), None
+
+    import boto3
+    if mode == 'moto':
+        try:
+            from moto import mock_aws
+        except ImportError:
+            from moto import mock_s3 as mock_aws
+        mock = mock_aws()
+        mock.start()
+        client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='bench', aws_secret_access_key='bench')
+    else:
+        mock = None
+        client = boto3.client('s3', endpoint_url=endpoint_url)
+    client.create_bucket(Bucket='bench-training-data')
+    return client, mock
+
+def _timed(timings, stage, started):
+    timings[stage] += time.perf_counter() - started
+
+def _run_case(case: dict, args_dict: dict, results) -> None:
+    # Answers for every Python-level failure; wait_for_result covers processes that die outright
+    try:
+        results.put(_measure_case(case, args_dict))
+    except Exception as e:
+        results.put({'case': case['label'], 'error': f"{type(e).__name__}: {e}"})
+
+def _measure_case(case: dict, args_dict: dict) -> dict:
+    work_dir = Path(case['work_dir'])
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # The pages go through process_page one by one, as a single page worker runs them, and the
+    # stage timings are the ones it reports
+    extractor = AWSAutoHealingExtractor(max_workers=1, ocr_cache=OCRCache(work_dir / 'ocr'),
+                                        result_cache=ResultCache(work_dir / 'results'),
+                                        ocr_mode='always' if args_dict['ocr'] else 'never')
+    timings = dict.fromkeys(STAGES, 0.0)
+    ocr_stats = dict.fromkeys(OCR_STAT_COUNTERS, 0)
+    uploaded_bytes = None
+
+    # Scenarios point into the consolidated text, as they do in the pipeline
+    document_text = DocumentText()
+    page_texts = PageTextJoiner()
+    scenarios = []
+    doc = fitz.open(case['pdf_path'])
+    try:
+        ocr_memo = {}
+        for page_num in range(len(doc)):
+            page_result = extractor.process_page(doc, page_num, ocr_memo)
+            for stage, seconds in page_result['timings'].items():
+                timings[stage] += seconds
+            for counter, value in page_result['ocr_stats'].items():
+                ocr_stats[counter] += value
+            text_offset = page_texts.append(page_result['text'])
+            if page_result['scenario']:
+                page_result['scenario'].bind(document_text, text_offset)
+                scenarios.append(page_result['scenario'])
+    finally:
+        doc.close()
+    document_text.text = page_texts.join()
+
+    started = time.perf_counter()
+    training_examples = extractor.build_training_examples(scenarios)
+    _timed(timings, 'training_generation', started)
+
+    extraction_data = {
+        'metadata': {'source_file': case['label'], 'document_key': document_key(Path(case['pdf_path']).name),
+                     'total_pages': case['pages']},
+        'consolidated_text': document_text.text,
+        'page_offsets': page_texts.text_offsets,
+        'auto_healing_scenarios': scenarios,
+        'aws_services_found': sorted({service for scenario in scenarios for service in scenario.aws_services}),
+        'training_examples': training_examples,
+        'high_priority_content': [scenario for scenario in scenarios if scenario.priority_score > 3]
+    }
+    s3_client, mock = make_s3_client(args_dict['s3'], args_dict['s3_endpoint_url'], work_dir / 's3')
+    try:
+        s3_manager = S3Manager(s3_client=s3_client)
+        started = time.perf_counter()
+        if not s3_manager.upload_training_data_to_s3('bench-training-data', extraction_data, case['label']):
+            raise RuntimeError("upload to the S3 stand-in failed")
+        _timed(timings, 's3_upload', started)
+    finally:
+        if mock is not None:
+            mock.stop()
+    if args_dict['s3'] == 'local':
+        uploaded_bytes = sum(path.stat().st_size for path in (work_dir / 's3').rglob('*')
+                                       if path.is_file())
+
+    # The same document through the real pipeline, with empty caches and the default OCR policy
+    end_to_end_extractor = AWSAutoHealingExtractor(max_workers=args_dict['page_workers'],
+                                                   ocr_cache=OCRCache(work_dir / 'ocr-e2e'),
+                                                   result_cache=ResultCache(work_dir / 'results-e2e'),
+                                                   ocr_mode='auto' if args_dict['ocr'] else 'never')
+    started = time.perf_counter()
+    end_to_end_data = end_to_end_extractor.process_pdf_for_auto_healing(case['pdf_path'])
+    end_to_end_seconds = time.perf_counter() - started
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    pages = case['pages']
+    return {
+        'case': case['label'],
+        'pages': pages,
+        'images_per_page': case['images_per_page'],
+        'words_per_page': case['words_per_page'],
+        'pdf_bytes': case['pdf_bytes'],
+        'images': ocr_stats['images_seen'],
+        'scenarios': len(scenarios),
+        'training_examples': len(training_examples),
+        'stages': {
+            stage: {
+                'seconds': round(seconds, 4),
+                'pages_per_second': round(pages / seconds, 2) if seconds else None
+            }
+            for stage, seconds in timings.items() if stage != 'ocr' or args_dict['ocr']
+        },
+        'uploaded_bytes': uploaded_bytes,
+        'ocr_stats': ocr_stats,
+        'end_to_end': {
+            'seconds': round(end_to_end_seconds, 4),
+            'pages_per_second': round(pages / end_to_end_seconds, 2),
+            'page_workers': args_dict['page_workers'],
+            # The pipeline's own per-stage instrumentation for the same run
+            'stage_timings': {stage: round(seconds, 4) for stage, seconds in
+                              end_to_end_data['metadata']['stage_timings'].items()} if end_to_end_data else None
+        },
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': round(peak_rss / 1024, 1),
+        'peak_rss_delta_mb': round((peak_rss - baseline_rss) / 1024, 1)
+    }
+
+def _int_list(value: str):
+    return [int(item) for item in value.split(',') if item]
+
+def _current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the extraction pipeline")
+    parser.add_argument('--pages', type=_int_list, default=[10, 50], help="Comma-separated page counts")
+    parser.add_argument('--images', type=_int_list, default=[0, 2], help="Comma-separated images per page")
+    parser.add_argument('--words', type=_int_list, default=[300, 1200], help="Comma-separated words per page")
+    parser.add_argument('--image-width', type=int, default=1200, help="Pixel width of embedded images")
+    parser.add_argument('--page-workers', type=int, default=1, help="Page workers for the end-to-end run")
+    parser.add_argument('--no-ocr', action='store_true', help="Skip the OCR stage (also off when tesseract is missing)")
+    parser.add_argument('--s3', choices=('local', 'moto', 'endpoint'), default='local',
+                        help="S3 stand-in: a local directory, moto's in-memory S3 or --s3-endpoint-url")
+    parser.add_argument('--s3-endpoint-url', help="S3-compatible endpoint used with --s3 endpoint")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--case-timeout', type=float, default=3600, help="Seconds before a case is abandoned")
+    parser.add_argument('--output', type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.s3 == 'endpoint' and not args.s3_endpoint_url:
+        parser.error("--s3 endpoint needs --s3-endpoint-url")
+
+    extractor = AWSAutoHealingExtractor(max_workers=1)
+    ocr_available = extractor.ocr_backend_name == 'tesserocr' or shutil.which('tesseract') is not None
+    args_dict = {
+        'ocr': ocr_available and not args.no_ocr,
+        's3': args.s3,
+        's3_endpoint_url': args.s3_endpoint_url,
+        'page_workers': args.page_workers
+    }
+    if not ocr_available and not args.no_ocr:
+        print("tesseract not found; skipping the OCR stage", file=sys.stderr)
+
+    context = multiprocessing.get_context('spawn')
+    report = {
+        'benchmark': 'pipeline',
+        'commit': _current_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pymupdf': fitz.VersionBind,
+        'ocr_backend': extractor.ocr_backend_name if args_dict['ocr'] else None,
+        's3': args.s3,
+        'cases': []
+    }
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        for pages in args.pages:
+            for images_per_page in args.images:
+                for words in args.words:
+                    label = f"p{pages}_i{images_per_page}_w{words}"
+                    work_dir = Path(corpus_dir) / label
+                    work_dir.mkdir()
+                    pdf_path = work_dir / f"{label}.pdf"
+                    build_runbook_pdf(pdf_path, pages, images_per_page, words, args.image_width, args.seed)
+                    case = {
+                        'label': label,
+                        'pages': pages,
+                        'images_per_page': images_per_page,
+                        'words_per_page': words,
+                        'pdf_path': str(pdf_path),
+                        'pdf_bytes': pdf_path.stat().st_size,
+                        'work_dir': str(work_dir)
+                    }
+
+                    # Each case runs in a fresh process so peak RSS is not shared between them
+                    results = context.Queue()
+                    process = context.Process(target=_run_case, args=(case, args_dict, results))
+                    process.start()
+                    result = wait_for_result(process, results, args.case_timeout)
+                    process.join()
+                    result.setdefault('case', label)
+                    report['cases'].append(result)
+                    if 'error' in result:
+                        print(f"{label:18} failed: {result['error']}", file=sys.stderr)
+                        continue
+
+                    stage_summary = "  ".join(f"{stage} {timing['seconds'] * 1000:8.1f} ms"
+                                              for stage, timing in result['stages'].items())
+                    print(f"{label:18} {stage_summary}  end-to-end {result['end_to_end']['pages_per_second']:7.1f} pages/s  "
+                          f"peak RSS {result['peak_rss_mb']:7.1f} MB", file=sys.stderr)
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json + "\n", encoding='utf-8')
+    else:
+        print(report_json)
+
+if __name__ == "__main__":
+    main()
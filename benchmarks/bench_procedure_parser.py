@@ -0,0 +1,100 @@
+# bench_procedure_parser.py - Adversarial inputs for step and command extraction, with a time budget
+#
+# Feeds ProcedureParser the OCR-garbage shapes that made the old step regex backtrack
+# quadratically (long digit runs, a step number followed by thousands of blank or whitespace
+# lines) plus inputs aimed at the line parser itself. Fails with exit status 1 when any case
+# exceeds the time budget or grows faster than linearly, so it can gate a change.
+# tests/test_procedure_parser.py runs the same cases, plus the expected extractions, under pytest.
+#
+# Usage: python benchmarks/bench_procedure_parser.py [--chars 200000] [--budget-ms 1000] [--with-legacy]
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aws_auto_healing_extractor import ProcedureParser, fold_case
+
+# Each case builds a page of roughly n characters; the first three made the old step regex
+# backtrack quadratically. tests/test_procedure_parser.py imports these.
+ADVERSARIAL_CASES = {
+    'digit_run': lambda n: "1" * n,
+    'step_then_blank_lines': lambda n: "1 x" + "\n" * n,
+    'step_then_whitespace_lines': lambda n: "1" + " \n" * (n // 2),
+    'numbered_lines': lambda n: "1\n" * (n // 2),
+    'numbered_empty_steps': lambda n: "12.\n" * (n // 4),
+    'long_step_line': lambda n: "1. " + "restart " * (n // 8),
+    'ordinal_words': lambda n: "then " * (n // 5),
+    'ordinal_separators': lambda n: "first" + ", " * (n // 2),
+    'aws_tokens': lambda n: "run " + "aws " * (n // 4),
+    'dollar_lines': lambda n: "$ \n" * (n // 3),
+    'mixed_ocr_noise': lambda n: ("0O1l| 2. 3: \n \t\n" * (n // 15)),
+}
+
+# The step and command regexes ProcedureParser replaced, for --with-legacy
+LEGACY_PATTERNS = [
+    re.compile(r'(?i)(?:step\s*)?(\d+)[\.\:\-\s]+([^\n]+(?:\n(?!\s*(?:step\s*)?\d+[\.\:\-])[^\n]*)*)'),
+    re.compile(r'(?i)(first|then|next|finally|lastly)[,\s]+([^\n\.]+)'),
+    re.compile(r'(?:^|\n)\s*(?:\$\s*|aws\s+|sudo\s+|docker\s+|kubectl\s+|terraform\s+)([^\n]+)'),
+    re.compile(r'(?i)(aws\s+\w+\s+[^\n]+)'),
+]
+
+def time_parser(parser: ProcedureParser, text: str, repeat: int) -> float:
+    folded_text = fold_case(text)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(text, folded_text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def time_legacy(text: str) -> float:
+    start = time.perf_counter()
+    for pattern in LEGACY_PATTERNS:
+        pattern.findall(text)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Check procedure extraction against adversarial pages")
+    parser.add_argument('--chars', type=int, default=200000, help="Size of each adversarial page")
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="Maximum time per page of --chars")
+    parser.add_argument('--max-growth', type=float, default=8.0,
+                        help="Maximum slowdown when the page grows 4x (linear is about 4, quadratic 16)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--with-legacy', action='store_true',
+                        help="Also time the replaced regexes on pages 1/25 the size (they are quadratic)")
+    args = parser.parse_args()
+
+    procedure_parser = ProcedureParser()
+    failures = []
+
+    for name, build_page in ADVERSARIAL_CASES.items():
+        small_page = build_page(args.chars // 4)
+        page = build_page(args.chars)
+        small_seconds = time_parser(procedure_parser, small_page, args.repeat)
+        seconds = time_parser(procedure_parser, page, args.repeat)
+        # Guard against timer resolution on cases that finish in microseconds
+        growth = seconds / max(small_seconds, 1e-4)
+
+        line = f"{name:28} {len(page):>9,} chars  {seconds * 1000:9.2f} ms  growth x4 input: {growth:5.1f}"
+        if args.with_legacy:
+            legacy_page = build_page(args.chars // 25)
+            line += f"  | legacy regexes on {len(legacy_page):,} chars: {time_legacy(legacy_page) * 1000:9.2f} ms"
+        print(line)
+
+        if seconds * 1000 > args.budget_ms:
+            failures.append(f"{name}: {seconds * 1000:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        if seconds * 1000 > 1 and growth > args.max_growth:
+            failures.append(f"{name}: {growth:.1f}x slower on a 4x larger page")
+
+    if failures:
+        print("\n".join(["FAILED:"] + failures), file=sys.stderr)
+        return 1
+    print("all adversarial cases within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
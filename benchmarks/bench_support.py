@@ -0,0 +1,24 @@
+# bench_support.py - Helpers shared by the benchmarks that run each case in a fresh process
+#
+# Not a benchmark itself; the benchmark scripts import it from their own directory.
+
+import queue
+import time
+
+def wait_for_result(process, results, timeout: float) -> dict:
+    # A case process that dies hard (segfault, OOM kill) never puts a result on the queue
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            try:
+                # The result may have arrived just as the process exited
+                return results.get(timeout=1)
+            except queue.Empty:
+                return {'error': f"case process exited with status {process.exitcode}"}
+        if time.monotonic() > deadline:
+            process.terminate()
+            return {'error': f"timed out after {timeout:.0f}s"}
@@ -0,0 +1,83 @@
+# test_job_queue.py - Jobs submitted from the Streamlit app keep working after the script reruns
+#
+# Usage: python -m pytest tests/
+
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+st = pytest.importorskip('streamlit')
+fitz = pytest.importorskip('fitz')
+moto = pytest.importorskip('moto')
+import boto3
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import aws_auto_healing_extractor as engine
+
+APP_PATH = ROOT / 'app.py'
+BUCKET = 'runbook-training-data'
+JOB_TIMEOUT_SECONDS = 120
+
+def run_app_script(monkeypatch) -> types.ModuleType:
+    # What Streamlit does on every rerun: execute app.py in a fresh module installed as __main__
+    module = types.ModuleType('__main__')
+    module.__file__ = str(APP_PATH)
+    monkeypatch.setitem(sys.modules, '__main__', module)
+    exec(compile(APP_PATH.read_text(encoding='utf-8'), str(APP_PATH), 'exec'), module.__dict__)
+    return module
+
+def build_pdf(pages: int = 6) -> bytes:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"EC2 recovery, part {number}\n"
+                                             "1. Restart the EC2 instance\n"
+                                             "2. Check that the CloudWatch alarm clears")
+    return doc.tobytes()
+
+def wait_for_job(job_queue: engine.JobQueue, job_id: str) -> engine.ProcessingJob:
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    job = job_queue.get(job_id)
+    while job.is_active() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return job
+
+@pytest.fixture
+def aws(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        boto3.client('s3').create_bucket(Bucket=BUCKET)
+        yield
+
+def test_job_submitted_after_a_rerun_uses_the_worker_pool(aws, tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, 'CACHE_DIR', tmp_path)
+    monkeypatch.setenv('PDF_PROCESSOR_MAX_JOBS', '1')
+    # Enough CPUs for the queue to hand the job more than one page worker process
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    try:
+        first_run = run_app_script(monkeypatch)
+        second_run = run_app_script(monkeypatch)
+        job_queue = second_run.get_job_queue()
+        # Cached across reruns, so the queue and its caches were created by the first run
+        assert job_queue is first_run.get_job_queue()
+
+        job_id = job_queue.submit(build_pdf(), 'ec2-recovery.pdf', BUCKET, page_workers=2, ocr_mode='never')
+        job = wait_for_job(job_queue, job_id)
+
+        assert job.status == 'done', job.messages
+        assert job.page_workers == 2
+        assert job.extraction_data['metadata']['total_pages'] == 6
+        keys = [item['Key'] for item in boto3.client('s3').list_objects_v2(Bucket=BUCKET)['Contents']]
+        assert any(key.startswith('training_data/ec2-recovery_') for key in keys)
+    finally:
+        st.cache_resource.clear()
+        st.cache_data.clear()
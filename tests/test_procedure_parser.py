@@ -0,0 +1,97 @@
+# test_procedure_parser.py - What ProcedureParser extracts from representative pages, and that
+# adversarial OCR output stays within a linear time budget
+#
+# Usage: python -m pytest tests/
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from aws_auto_healing_extractor import ProcedureParser, fold_case
+# Shared with the benchmark, which times the same pages at a larger size
+from bench_procedure_parser import ADVERSARIAL_CASES
+
+def parse(text: str):
+    return ProcedureParser().parse(text, fold_case(text))
+
+def test_numbered_steps_anchor_to_line_starts():
+    text = ("Recovery procedure\n"
+            "1. Stop the instance\n"
+            "2. Detach the volume\n"
+            "   and snapshot it\n"
+            "\n"
+            "Step 3: Start the instance\n"
+            "12) Verify the alarm clears")
+    assert parse(text) == ([
+        ('1', "Stop the instance"),
+        ('2', "Detach the volume\nand snapshot it"),
+        ('3', "Start the instance"),
+        ('12', "Verify the alarm clears"),
+    ], [])
+
+def test_numbers_that_are_not_steps():
+    text = ("Version 10.0.0.1 is required\n"
+            "The 3rd attempt failed\n"
+            "2024 errors were logged\n"
+            "See section 4.2 for details")
+    assert parse(text) == ([], [])
+
+def test_ordinal_steps_match_whole_words_only():
+    text = ("First, open the CloudWatch console. Then check the alarm history.\n"
+            "Finally restart the task\n"
+            "The firstline parser is unrelated. Thenceforth nothing")
+    assert parse(text) == ([
+        ('First', "open the CloudWatch console"),
+        ('Then', "check the alarm history"),
+        ('Finally', "restart the task"),
+    ], [])
+
+def test_commands_keep_the_tool_name_and_are_unique():
+    text = ("$ aws ec2 describe-instances --instance-ids i-123\n"
+            "sudo systemctl restart nginx\n"
+            "Run aws rds reboot-db-instance --db-instance-identifier prod to recover.\n"
+            "kubectl\n"
+            "saws ec2 nothing\n"
+            "$ aws ec2 describe-instances --instance-ids i-123\n"
+            "Docker ps -a")
+    assert parse(text) == ([], [
+        "aws ec2 describe-instances --instance-ids i-123",
+        "sudo systemctl restart nginx",
+        "aws rds reboot-db-instance --db-instance-identifier prod to recover.",
+        "Docker ps -a",
+    ])
+
+def test_step_actions_are_bounded():
+    text = "1. Restart\n" + "more detail\n" * 100
+    steps, _ = parse(text)
+    assert len(steps) == 1
+    assert steps[0][1].count("\n") == ProcedureParser.MAX_STEP_LINES - 1
+
+PAGE_CHARS = 100000
+BUDGET_SECONDS = 1.0
+
+def best_parse_seconds(text: str, repeat: int = 3) -> float:
+    parser = ProcedureParser()
+    folded_text = fold_case(text)
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser.parse(text, folded_text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+@pytest.mark.parametrize('build_page', ADVERSARIAL_CASES.values(), ids=ADVERSARIAL_CASES.keys())
+def test_adversarial_pages_stay_linear(build_page):
+    seconds = best_parse_seconds(build_page(PAGE_CHARS))
+    assert seconds < BUDGET_SECONDS
+
+    # A 4x larger page should take about 4x as long; quadratic behaviour would be 16x
+    small_seconds = best_parse_seconds(build_page(PAGE_CHARS // 4))
+    if seconds > 0.01:
+        assert seconds / small_seconds < 8
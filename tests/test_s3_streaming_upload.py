@@ -0,0 +1,79 @@
+# test_s3_streaming_upload.py - S3StreamingUpload against moto's S3: multipart parts, the single
+# put_object for small objects, and that a failed stream leaves no multipart upload behind
+#
+# Usage: python -m pytest tests/
+
+import sys
+from pathlib import Path
+
+import pytest
+
+moto = pytest.importorskip('moto')
+import boto3
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aws_auto_healing_extractor import S3Manager, S3StreamingUpload
+
+BUCKET = 'runbook-training-data'
+# The smallest part S3 accepts for every part but the last
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def read_object(s3_client, key: str) -> bytes:
+    return s3_client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+
+def pending_uploads(s3_client):
+    return s3_client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', [])
+
+def test_large_object_is_sent_in_parts_with_a_short_final_part(s3_client):
+    # Written in chunks that do not line up with the part boundaries
+    data = bytes(range(256)) * (12 * 1024 * 1024 // 256) + b"tail"
+    chunk_size = 1024 * 1024 + 3
+    upload = S3StreamingUpload(s3_client, BUCKET, 'big.jsonl', 'application/jsonl', part_size=MIN_PART_SIZE)
+    for start in range(0, len(data), chunk_size):
+        upload.write(data[start:start + chunk_size])
+    upload.close()
+
+    assert upload.bytes_written == len(data)
+    assert read_object(s3_client, 'big.jsonl') == data
+    head = s3_client.head_object(Bucket=BUCKET, Key='big.jsonl')
+    # Multipart ETags end in the number of parts
+    assert head['ETag'].strip('"').endswith('-3')
+    assert head['ContentType'] == 'application/jsonl'
+    last_part = s3_client.head_object(Bucket=BUCKET, Key='big.jsonl', PartNumber=3)
+    assert last_part['ContentLength'] == len(data) - 2 * MIN_PART_SIZE
+    assert pending_uploads(s3_client) == []
+
+@pytest.mark.parametrize('data', [b"", b'{"instruction": "Restart the instance"}\n' * 100], ids=['empty', 'small'])
+def test_object_smaller_than_a_part_is_a_single_put(s3_client, data):
+    upload = S3StreamingUpload(s3_client, BUCKET, 'small.jsonl', 'application/jsonl', part_size=MIN_PART_SIZE)
+    upload.write(data)
+    upload.close()
+
+    assert read_object(s3_client, 'small.jsonl') == data
+    head = s3_client.head_object(Bucket=BUCKET, Key='small.jsonl')
+    assert '-' not in head['ETag']
+    assert head['ContentType'] == 'application/jsonl'
+
+def test_failed_stream_aborts_the_multipart_upload(s3_client):
+    def chunks():
+        # One full part goes out before the source fails
+        yield b"x" * (S3StreamingUpload.PART_SIZE + 1)
+        raise RuntimeError("source went away")
+
+    s3_manager = S3Manager(s3_client=s3_client)
+    with pytest.raises(RuntimeError, match="source went away"):
+        s3_manager.stream_object(BUCKET, 'broken.txt', chunks(), 'text/plain')
+
+    assert pending_uploads(s3_client) == []
+    assert 'Contents' not in s3_client.list_objects_v2(Bucket=BUCKET)